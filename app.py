@@ -10,19 +10,32 @@ from flasgger import Swagger
 import sentry_sdk
 from sentry_sdk.integrations.flask import FlaskIntegration
 
+from commands import LazyAppGroup
+from encoders import JSONEncoder
+import timing
+
 # error reporting with sentry
 sentry_sdk.init(dsn=os.environ.get("SENTRY_DSN"), integrations=[FlaskIntegration()])
 
 app = Flask(__name__)
+# ingest and operations commands are imported when they run, see commands.py
+app.cli = LazyAppGroup(app.name)
+app.json_encoder = JSONEncoder
 CORS(app)
 
 app.config["CACHE_REDIS_URL"] = os.getenv("REDISCLOUD_URL")
 app.config["CACHE_TYPE"] = (
     "RedisCache" if app.config["ENV"] == "production" else "NullCache"
 )
+app.config["FAST_SERIALIZER"] = os.getenv("FAST_SERIALIZER", "true") == "true"
+# orjson only writes UTF-8, so it is used once this is off, see encoders.JSONEncoder
+app.config["JSON_AS_ASCII"] = os.getenv("JSON_AS_ASCII", "true") == "true"
 app.config["JSON_SORT_KEYS"] = False
-app.config["JSONIFY_PRETTYPRINT_REGULAR"] = True
+app.config["JSONIFY_PRETTYPRINT_REGULAR"] = app.config["ENV"] != "production"
+app.config["LATENCY_BUDGET_MS"] = int(os.getenv("LATENCY_BUDGET_MS", 1000))
+app.config["QUERY_BUDGET"] = int(os.getenv("QUERY_BUDGET", 20))
 app.config["SECRET_KEY"] = os.getenv("SECRET_KEY")
+app.config["SERVER_TIMING"] = os.getenv("SERVER_TIMING", "false") == "true"
 app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config["SWAGGER"] = {
@@ -44,23 +57,14 @@ db = SQLAlchemy(app)
 ma = Marshmallow(app)
 migrate = Migrate(app, db)
 swagger = Swagger(app, template=template)
+# opt-in Server-Timing headers and query budgets
+timing.init_app(app)
 
 with app.app_context():
-    # needed to make CLI ingest work
-    from ingest.author_permissions import *
-    from ingest.issn.issn_commands import *
-    from ingest.open_access import *
-    from ingest.readership import *
-    from ingest.repositories import *
-    from ingest.sample_dois import *
-    from ingest.locations import *
-    from ingest.citations import *
-    from ingest.currency.currency import *
-    from ingest.retraction_watch import *
-    from ingest.apc.apc_commands import *
-    from ingest.subscription.subscription_commands import *
-    from ingest.journals.journals_commands import *
-    from ingest.journal_metadata.metadata_commands import *
-    from operations.issn.issn_operations_commands import *
-    from operations.status.status_commands import *
+    # bumps journal versions on every flush
+    import models.versions
+
+    # request metrics and the /metrics endpoint
+    import metrics
+
     import views
@@ -0,0 +1,439 @@
+"""
+Latency percentiles, throughput and queries per request of the API endpoints, run
+in-process against the database in DATABASE_URL, filled by flask
+generate_synthetic_data. Results are written as JSON so the runs of two commits can
+be diffed, or checked against an earlier run with --baseline, which exits with an
+error when an endpoint got slower or runs more queries.
+
+Run from the project root with DATABASE_URL set, and FLASK_ENV=development so
+responses are not served from the cache:
+    python -m benchmarks.api_benchmark --output main.json
+    python -m benchmarks.api_benchmark --baseline main.json
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import quote, urlencode
+
+from app import app, db
+from models.journal import JournalStatus
+
+PHASES = ["db", "serialize", "encode"]
+# runs with other settings are not comparable
+COMPARABLE_SETTINGS = [
+    "journals",
+    "cache_type",
+    "concurrency",
+    "requests",
+    "paged_requests",
+    "seed",
+]
+# top-level keys of /journals, see docs/journals.yml
+JOURNAL_ATTRS = [
+    "id",
+    "issn_l",
+    "issns",
+    "title",
+    "publisher",
+    "previous_issn_ls",
+    "other_titles",
+    "journal_metadata",
+    "total_dois",
+    "dois_by_issued_year",
+    "subscription_pricing",
+    "apc_pricing",
+    "status",
+    "status_as_of",
+]
+SEARCH_QUERIES = [
+    "applied",
+    "journal of eco",
+    "genetics",
+    "international finance",
+    "chem",
+    "no such title",
+]
+
+
+class Case:
+    """
+    Requests of one endpoint with one set of query parameters, over sampled journals.
+    """
+
+    def __init__(self, name, endpoint, paths, requests):
+        self.name = name
+        self.endpoint = endpoint
+        self.paths = paths
+        self.requests = requests
+        self.results = []
+        self.seconds = 0.0
+
+    def request_paths(self):
+        return list(itertools.islice(itertools.cycle(self.paths), self.requests))
+
+
+def sample_data(rng, size):
+    """
+    issn_ls, secondary issns and the largest publishers of the database, sampled with
+    rng so every run requests the same journals.
+    """
+    issn_ls = [
+        row[0]
+        for row in db.session.execute("SELECT issn_l FROM journals ORDER BY issn_l")
+    ]
+    secondary_issns = [
+        row[0]
+        for row in db.session.execute(
+            """
+            SELECT m.issn
+            FROM issn_to_issnl m
+            JOIN journals j ON j.issn_l = m.issn_l
+            WHERE m.issn <> m.issn_l
+            ORDER BY m.issn
+            """
+        )
+    ]
+    publishers = [
+        row[0]
+        for row in db.session.execute(
+            """
+            SELECT p.name
+            FROM publishers p
+            JOIN journals j ON j.publisher_id = p.id
+            GROUP BY p.name
+            ORDER BY count(*) DESC, p.name
+            LIMIT 3
+            """
+        )
+    ]
+    if not issn_ls or not secondary_issns or not publishers:
+        sys.exit("no journals to benchmark, run flask generate_synthetic_data first")
+    return {
+        "issn_ls": rng.sample(issn_ls, min(size, len(issn_ls))),
+        "secondary_issns": rng.sample(secondary_issns, min(size, len(secondary_issns))),
+        "publishers": publishers,
+        "journals": len(issn_ls),
+    }
+
+
+def journals_paged_cases(publishers, requests):
+    """
+    A case for no attrs, each attr and all attrs, crossed with no, one and several
+    publishers and with no and each status.
+    """
+    attrs_options = [None] + JOURNAL_ATTRS + [",".join(JOURNAL_ATTRS)]
+    publishers_options = [None, publishers[0], ",".join(publishers)]
+    status_options = [None] + [status.value for status in JournalStatus]
+
+    cases = []
+    for attrs, publisher_names, status in itertools.product(
+        attrs_options, publishers_options, status_options
+    ):
+        params = {
+            key: value
+            for key, value in [
+                ("attrs", attrs),
+                ("publishers", publisher_names),
+                ("status", status),
+            ]
+            if value is not None
+        }
+        path = "/journals"
+        if params:
+            path += "?" + urlencode(params, safe=",")
+        cases.append(Case(path, "journals_paged", [path], requests))
+    return cases
+
+
+def build_cases(sample, requests, paged_requests):
+    issn_ls = sample["issn_ls"]
+    cases = [
+        Case(
+            "/journals/<issn_l>",
+            "journal_detail",
+            ["/journals/{}".format(issn_l) for issn_l in issn_ls],
+            requests,
+        ),
+        Case(
+            "/journals/<issn>, redirect to issn_l",
+            "journal_detail",
+            ["/journals/{}".format(issn) for issn in sample["secondary_issns"]],
+            requests,
+        ),
+        Case(
+            "/journals/search",
+            "search",
+            ["/journals/search?query={}".format(quote(q)) for q in SEARCH_QUERIES],
+            requests,
+        ),
+        Case(
+            "/journals/<issn_l>/open-access",
+            "open_access",
+            ["/journals/{}/open-access".format(issn_l) for issn_l in issn_ls],
+            requests,
+        ),
+        Case(
+            "/journals/<issn_l>/repositories",
+            "repositories",
+            ["/journals/{}/repositories".format(issn_l) for issn_l in issn_ls],
+            requests,
+        ),
+    ]
+    return cases + journals_paged_cases(sample["publishers"], paged_requests)
+
+
+def server_timing(header):
+    durations = {}
+    for timing in header.split(","):
+        name, _, duration = timing.strip().partition(";dur=")
+        durations[name] = float(duration)
+    return durations
+
+
+def timed_get(client, path):
+    start = time.perf_counter()
+    response = client.get(path)
+    size = len(response.data)
+    elapsed = time.perf_counter() - start
+    return {
+        "ms": elapsed * 1000,
+        "status": response.status_code,
+        "queries": int(response.headers["X-Query-Count"]),
+        "bytes": size,
+        "phases": server_timing(response.headers["Server-Timing"]),
+    }
+
+
+def run_case(case, clients, warmup):
+    # warm up, so loading the publisher index and compiling dumpers are not timed
+    for path in case.paths[:warmup]:
+        clients[0].get(path)
+
+    paths = case.request_paths()
+    start = time.perf_counter()
+    if len(clients) == 1:
+        case.results = [timed_get(clients[0], path) for path in paths]
+    else:
+        # each thread sends its share of the requests with its own client
+        def send(index):
+            share = paths[index :: len(clients)]
+            return [timed_get(clients[index], path) for path in share]
+
+        with ThreadPoolExecutor(len(clients)) as executor:
+            shares = executor.map(send, range(len(clients)))
+            case.results = [result for share in shares for result in share]
+    case.seconds = time.perf_counter() - start
+
+
+def percentiles(timings):
+    if len(timings) < 2:
+        return timings * 3
+    cuts = statistics.quantiles(timings, n=100, method="inclusive")
+    return [cuts[49], cuts[94], cuts[98]]
+
+
+def summarize(results, seconds):
+    timings = [r["ms"] for r in results]
+    p50, p95, p99 = percentiles(timings)
+    summary = {
+        "requests": len(results),
+        "p50_ms": round(p50, 2),
+        "p95_ms": round(p95, 2),
+        "p99_ms": round(p99, 2),
+        "mean_ms": round(statistics.mean(timings), 2),
+        "throughput_rps": round(len(results) / seconds, 1),
+        "queries_per_request": round(statistics.mean(r["queries"] for r in results), 2),
+        "bytes_per_request": round(statistics.mean(r["bytes"] for r in results)),
+        "statuses": {
+            str(status): count
+            for status, count in sorted(Counter(r["status"] for r in results).items())
+        },
+    }
+    for phase in PHASES:
+        summary["{}_ms".format(phase)] = round(
+            statistics.mean(r["phases"][phase] for r in results), 2
+        )
+    return summary
+
+
+def summarize_endpoints(cases):
+    endpoints = {}
+    for case in cases:
+        results, seconds = endpoints.get(case.endpoint, ([], 0.0))
+        endpoints[case.endpoint] = (results + case.results, seconds + case.seconds)
+    return {
+        endpoint: summarize(results, seconds)
+        for endpoint, (results, seconds) in sorted(endpoints.items())
+    }
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("-dirty" if dirty else "")
+
+
+def compare(results, baseline, tolerance):
+    """
+    Endpoints whose p95 grew by more than tolerance, and endpoints or cases that run
+    more queries per request, than in the baseline run. Cases only get a few requests
+    each, too few for stable percentiles, but their query counts are exact.
+    """
+    regressions = []
+    for section in ["endpoints", "cases"]:
+        for name, summary in results[section].items():
+            before = baseline[section].get(name)
+            if before is None:
+                continue
+            max_p95_ms = before["p95_ms"] * (1 + tolerance)
+            if section == "endpoints" and summary["p95_ms"] > max_p95_ms:
+                regressions.append(
+                    "{}: p95 {:.1f} ms, was {:.1f} ms".format(
+                        name, summary["p95_ms"], before["p95_ms"]
+                    )
+                )
+            if summary["queries_per_request"] > before["queries_per_request"]:
+                regressions.append(
+                    "{}: {} queries per request, was {}".format(
+                        name,
+                        summary["queries_per_request"],
+                        before["queries_per_request"],
+                    )
+                )
+    return regressions
+
+
+def report(endpoints):
+    print(
+        "{:<16} {:>8} {:>9} {:>9} {:>9} {:>9} {:>8}".format(
+            "endpoint", "requests", "p50 ms", "p95 ms", "p99 ms", "req/s", "queries"
+        )
+    )
+    for endpoint, summary in endpoints.items():
+        print(
+            "{:<16} {:>8} {:>9.1f} {:>9.1f} {:>9.1f} {:>9.1f} {:>8.1f}".format(
+                endpoint,
+                summary["requests"],
+                summary["p50_ms"],
+                summary["p95_ms"],
+                summary["p99_ms"],
+                summary["throughput_rps"],
+                summary["queries_per_request"],
+            )
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200, help="Per case.")
+    parser.add_argument(
+        "--paged_requests",
+        type=int,
+        default=5,
+        help="Per attrs, publishers and status combination of /journals.",
+    )
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--baseline", help="Earlier output to compare with.")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="Allowed p95 growth, 0.2 is 20%%."
+    )
+    args = parser.parse_args()
+
+    # the default --output is a common --baseline, which the results would replace
+    baseline = None
+    if args.baseline:
+        if os.path.abspath(args.baseline) == os.path.abspath(args.output):
+            parser.error("--output would overwrite --baseline, pass another --output")
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    # query counts and phases come from the Server-Timing headers, and requests
+    # over budget are expected here
+    app.config["SERVER_TIMING"] = True
+    app.logger.setLevel(logging.ERROR)
+
+    with app.app_context():
+        sample = sample_data(random.Random(args.seed), args.requests)
+    cases = build_cases(sample, args.requests, args.paged_requests)
+    clients = [app.test_client() for _ in range(args.concurrency)]
+    print(
+        "{} cases against {} journals, cache {}".format(
+            len(cases), sample["journals"], app.config["CACHE_TYPE"]
+        )
+    )
+
+    start = time.perf_counter()
+    for case in cases:
+        run_case(case, clients, args.warmup)
+    seconds = time.perf_counter() - start
+
+    endpoints = summarize_endpoints(cases)
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "journals": sample["journals"],
+            "cache_type": app.config["CACHE_TYPE"],
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "paged_requests": args.paged_requests,
+            "seed": args.seed,
+            "seconds": round(seconds, 1),
+        },
+        "endpoints": endpoints,
+        "cases": {case.name: summarize(case.results, case.seconds) for case in cases},
+    }
+    report(endpoints)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print("results written to {}".format(args.output))
+
+    if baseline:
+        for setting in COMPARABLE_SETTINGS:
+            if results["meta"][setting] != baseline["meta"][setting]:
+                print(
+                    "warning: {} is {}, was {} in {}".format(
+                        setting,
+                        results["meta"][setting],
+                        baseline["meta"][setting],
+                        args.baseline,
+                    )
+                )
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print("regression: {}".format(regression))
+        if regressions:
+            sys.exit(1)
+        print("no regressions against {}".format(args.baseline))
+
+
+if __name__ == "__main__":
+    main()
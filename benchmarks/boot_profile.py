@@ -0,0 +1,59 @@
+"""
+Boot time and memory of a web worker, which imports views like gunicorn views:app does,
+measured in fresh interpreters, with the heavy ingest libraries the import pulled in.
+
+Run from the project root:
+    python -m benchmarks.boot_profile --runs 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ["boto3", "openpyxl", "pandas", "pyarrow", "regex", "requests", "s3fs"]
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": seconds,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def probe(module):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="views")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    results = [probe(args.module) for _ in range(args.runs)]
+    print("import {} in a fresh interpreter, {} runs".format(args.module, args.runs))
+    print(
+        "boot: {:.2f}s median, max rss: {:.0f} MB median, modules: {}".format(
+            statistics.median(r["seconds"] for r in results),
+            statistics.median(r["max_rss_mb"] for r in results),
+            results[-1]["modules"],
+        )
+    )
+    print("heavy ingest libraries loaded: {}".format(", ".join(results[-1]["heavy"])))
+
+
+if __name__ == "__main__":
+    main()
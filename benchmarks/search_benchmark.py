@@ -0,0 +1,149 @@
+"""
+Title search latency against a synthetic table of journal titles, before and after
+the pg_trgm indexes.
+
+Run from the project root with DATABASE_URL set:
+    python -m benchmarks.search_benchmark --titles 200000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app import app, db
+from models.journal import OTHER_TITLES_TEXT_FUNCTION
+
+WORDS = [
+    "journal",
+    "review",
+    "international",
+    "european",
+    "american",
+    "research",
+    "studies",
+    "medicine",
+    "science",
+    "management",
+    "financial",
+    "economics",
+    "history",
+    "applied",
+    "clinical",
+    "physics",
+    "chemistry",
+    "engineering",
+    "letters",
+    "quarterly",
+    "bulletin",
+    "archives",
+    "annals",
+    "advances",
+]
+QUERIES = [
+    "financial management",
+    "clinical",
+    "annals of history",
+    "quart",
+    "applied physics letters",
+    "europ",
+    "engineering research",
+    "bulletin",
+]
+SEARCH_SQL = text(
+    """
+    SELECT id, title
+    FROM search_benchmark
+    WHERE title ILIKE :pattern OR journal_other_titles(other_titles) ILIKE :pattern
+    ORDER BY greatest(
+        word_similarity(:query, title),
+        word_similarity(:query, journal_other_titles(other_titles))
+    ) DESC, title
+    LIMIT 20;
+    """
+)
+
+
+def random_title():
+    return " ".join(random.choice(WORDS) for _ in range(random.randint(2, 6))).title()
+
+
+def create_table(connection, titles):
+    connection.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+    connection.execute(OTHER_TITLES_TEXT_FUNCTION)
+    connection.execute("DROP TABLE IF EXISTS search_benchmark;")
+    connection.execute(
+        "CREATE TABLE search_benchmark (id serial PRIMARY KEY, title text NOT NULL, other_titles jsonb);"
+    )
+    rows = [
+        {
+            "title": random_title(),
+            "other_titles": '["{}"]'.format(random_title())
+            if random.random() < 0.2
+            else None,
+        }
+        for _ in range(titles)
+    ]
+    connection.execute(
+        text(
+            "INSERT INTO search_benchmark (title, other_titles) VALUES (:title, CAST(:other_titles AS jsonb));"
+        ),
+        rows,
+    )
+    connection.execute("ANALYZE search_benchmark;")
+
+
+def create_indexes(connection):
+    connection.execute(
+        "CREATE INDEX ON search_benchmark USING gin (title gin_trgm_ops);"
+    )
+    connection.execute(
+        "CREATE INDEX ON search_benchmark USING gin (journal_other_titles(other_titles) gin_trgm_ops);"
+    )
+    connection.execute("ANALYZE search_benchmark;")
+
+
+def run_queries(connection, rounds):
+    timings = []
+    for _ in range(rounds):
+        for query in QUERIES:
+            start = time.perf_counter()
+            connection.execute(
+                SEARCH_SQL, pattern="%" + query + "%", query=query
+            ).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(
+        "{}: p50 {:.1f} ms, p95 {:.1f} ms over {} queries".format(
+            label, statistics.median(timings), p95, len(timings)
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--titles", type=int, default=200000)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    random.seed(0)
+    with app.app_context():
+        with db.engine.connect() as connection:
+            print("creating {} titles".format(args.titles))
+            create_table(connection, args.titles)
+            try:
+                report("without trigram indexes", run_queries(connection, args.rounds))
+                create_indexes(connection)
+                report("with trigram indexes", run_queries(connection, args.rounds))
+            finally:
+                connection.execute("DROP TABLE search_benchmark;")
+
+
+if __name__ == "__main__":
+    main()
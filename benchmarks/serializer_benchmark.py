@@ -0,0 +1,64 @@
+"""
+Journals dumped per second by the marshmallow schemas and by the compiled dumpers,
+for the journals of a /journals?per-page=100 page.
+
+Run from the project root with DATABASE_URL set:
+    python -m benchmarks.serializer_benchmark --journals 100
+"""
+import argparse
+import time
+
+from app import app
+from models.journal import Journal
+from schemas.compiled import get_dumper
+from schemas.schema_combined import JournalDetailSchema, JournalListSchema
+from utils import journal_load_options
+
+
+def load_journals(count):
+    return (
+        Journal.query.options(*journal_load_options())
+        .order_by(Journal.created_at, Journal.id)
+        .limit(count)
+        .all()
+    )
+
+
+def dumps_per_second(dump_page, journals, rounds):
+    # warm up, so lazy loads and dumper compilation are not timed
+    dump_page(journals)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        dump_page(journals)
+    return len(journals) * rounds / (time.perf_counter() - start)
+
+
+def report(label, schema, journals, rounds):
+    dumper = get_dumper(schema)
+    marshmallow = dumps_per_second(
+        lambda page: schema.dump(page, many=True), journals, rounds
+    )
+    compiled = dumps_per_second(lambda page: dumper(page, True), journals, rounds)
+    print(
+        "{}: marshmallow {:.0f} dumps/s, compiled {:.0f} dumps/s ({:.1f}x)".format(
+            label, marshmallow, compiled, compiled / marshmallow
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--journals", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    # detail responses build absolute urls
+    with app.test_request_context():
+        journals = load_journals(args.journals)
+        print("dumping {} journals {} times".format(len(journals), args.rounds))
+        report("JournalListSchema", JournalListSchema(), journals, args.rounds)
+        report("JournalDetailSchema", JournalDetailSchema(), journals, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
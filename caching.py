@@ -0,0 +1,237 @@
+import hashlib
+from functools import wraps
+import time
+from urllib.parse import urlencode
+
+from flask import make_response, request
+from flask_caching.backends import NullCache
+
+from app import app, cache
+from compression import add_negotiated_encoding, is_compressible, use_precompressed
+
+RESPONSE_TIMEOUT = 60 * 60 * 24
+
+# query parameters holding comma-separated lists, where order does not matter
+LIST_PARAMETERS = ["attrs", "publishers", "status"]
+
+# responses built from many journals, such as lists and search results
+JOURNALS_TAG = "journals"
+
+# every response, for lookup tables like currencies and countries
+ALL_TAG = "all"
+
+CACHED_ENDPOINTS = []
+
+INVALIDATION_ATTEMPTS = 3
+# seconds before the first retry, doubled for each further retry
+INVALIDATION_BACKOFF = 0.2
+
+# tags whose invalidation failed, retired before the cache is read again
+pending_invalidations = set()
+
+
+class CacheInvalidationError(Exception):
+    """
+    Cached responses could not be invalidated after a data change. Until the cache
+    takes the pending invalidations, responses are served without the cache.
+    """
+
+
+def journal_tag(issn_l):
+    return "journal:{}".format(issn_l.upper())
+
+
+def cached_response(tags):
+    """
+    Caches the 200 responses of a view in the configured cache, keyed on the path and
+    normalized query string, along with their compressed bodies. tags is called with
+    the view arguments and returns the tags that invalidate the response.
+    """
+
+    def decorator(view):
+        CACHED_ENDPOINTS.append(view.__name__)
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                key = cache_key(tags(**kwargs))
+                cached = cache.get(key)
+            except Exception:
+                # the API keeps working without the cache
+                app.logger.exception("response cache unavailable")
+                return view(*args, **kwargs)
+
+            if cached is not None:
+                count_request(request.endpoint, "hits")
+                body, headers, compressed = cached
+                response = app.response_class(body, headers=headers)
+                response.headers["X-Cache"] = "HIT"
+                # compressed once per data change and encoding, for the first client
+                # that accepts it
+                if is_compressible(response) and add_negotiated_encoding(
+                    body, compressed
+                ):
+                    store_response(key, cached)
+                return use_precompressed(response.make_conditional(request), compressed)
+
+            response = make_response(view(*args, **kwargs))
+            if (
+                response.status_code == 200
+                and not response.is_streamed
+                # compress_response compresses the responses that are not stored
+                and not isinstance(cache.cache, NullCache)
+            ):
+                # redirects and errors are not cached, so they are not misses either
+                count_request(request.endpoint, "misses")
+                body = response.get_data()
+                compressed = {}
+                if is_compressible(response):
+                    add_negotiated_encoding(body, compressed)
+                store_response(key, (body, list(response.headers), compressed))
+                use_precompressed(response, compressed)
+            response.headers["X-Cache"] = "MISS"
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def store_response(key, cached):
+    try:
+        cache.set(key, cached, timeout=RESPONSE_TIMEOUT)
+    except Exception:
+        app.logger.exception("response cache unavailable")
+
+
+def cache_key(tags):
+    """
+    Same key for query strings that only differ in parameter order, list order or
+    publisher name case. The current token of each tag is part of the key, so
+    invalidating a tag retires all of its responses at once.
+    """
+    args = []
+    for key, value in request.args.items(multi=True):
+        if key in LIST_PARAMETERS:
+            values = [v.strip() for v in value.split(",") if v.strip()]
+            if key == "publishers":
+                values = [v.lower() for v in values]
+            value = ",".join(sorted(values))
+        args.append((key, value))
+
+    tags = list(tags) + [ALL_TAG]
+    tokens = get_tag_tokens(tags)
+    raw_key = "{}?{}|{}".format(
+        request.path,
+        urlencode(sorted(args)),
+        ",".join("{}={}".format(tag, tokens[tag]) for tag in tags),
+    )
+    # v2 entries hold the compressed bodies too
+    return "response:v2:{}".format(hashlib.sha1(raw_key.encode("utf-8")).hexdigest())
+
+
+def cached_count(name, count):
+    """
+    Result of count(), cached under name until journals change, so filtered listings
+    do not run the same count for every page.
+    """
+    try:
+        tags = [JOURNALS_TAG, ALL_TAG]
+        tokens = get_tag_tokens(tags)
+        key = "count:{}|{}".format(
+            name, ",".join("{}={}".format(tag, tokens[tag]) for tag in tags)
+        )
+        cached = cache.get(key)
+    except Exception:
+        app.logger.exception("response cache unavailable")
+        return count()
+
+    if cached is None:
+        cached = count()
+        try:
+            cache.set(key, cached, timeout=RESPONSE_TIMEOUT)
+        except Exception:
+            app.logger.exception("response cache unavailable")
+    return cached
+
+
+def get_tag_tokens(tags):
+    # stale responses must not be served while invalidations are pending
+    apply_pending_invalidations(attempts=1)
+    keys = ["tag:{}".format(tag) for tag in tags]
+    tokens = dict(zip(tags, cache.get_many(*keys)))
+    for tag, key in zip(tags, keys):
+        if tokens[tag] is None:
+            # new token, so responses cached under an evicted token are never served
+            cache.add(key, time.time_ns(), timeout=0)
+            tokens[tag] = cache.get(key)
+    return tokens
+
+
+def invalidate(tags):
+    """
+    Retires the cached responses of tags. Retried when the cache fails, and if it
+    keeps failing the tags stay pending and CacheInvalidationError is raised, so
+    ingest commands fail instead of leaving responses stale for RESPONSE_TIMEOUT.
+    """
+    pending_invalidations.update(tags)
+    apply_pending_invalidations(INVALIDATION_ATTEMPTS)
+
+
+def apply_pending_invalidations(attempts):
+    if not pending_invalidations:
+        return
+
+    tags = sorted(pending_invalidations)
+    for attempt in range(attempts):
+        if attempt:
+            time.sleep(INVALIDATION_BACKOFF * 2 ** (attempt - 1))
+        try:
+            cache.set_many(
+                {"tag:{}".format(tag): time.time_ns() for tag in tags},
+                timeout=0,
+            )
+        except Exception:
+            app.logger.exception("response cache unavailable")
+        else:
+            pending_invalidations.difference_update(tags)
+            return
+    raise CacheInvalidationError(
+        "cached responses of {} tags were not invalidated".format(len(tags))
+    )
+
+
+def invalidate_journals(issn_ls):
+    """
+    Retires the cached responses of changed journals and of every journal list.
+    """
+    invalidate([journal_tag(issn_l) for issn_l in sorted(issn_ls)] + [JOURNALS_TAG])
+
+
+def invalidate_all():
+    invalidate([ALL_TAG])
+
+
+def count_request(endpoint, result):
+    try:
+        # inc is atomic in redis, the Cache wrapper does not expose it
+        cache.cache.inc("cache_stats:{}:{}".format(endpoint, result))
+    except Exception:
+        app.logger.exception("response cache unavailable")
+
+
+def get_cache_stats():
+    stats = {}
+    for endpoint in CACHED_ENDPOINTS:
+        hits, misses = cache.get_many(
+            "cache_stats:{}:hits".format(endpoint),
+            "cache_stats:{}:misses".format(endpoint),
+        )
+        hits = int(hits or 0)
+        misses = int(misses or 0)
+        stats[endpoint] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+        }
+    return stats
@@ -0,0 +1,95 @@
+import importlib
+
+import click
+from flask.cli import AppGroup
+
+# flask commands by the module that defines them, imported only when they run
+COMMAND_MODULES = {
+    "add_cancelled_issns": "operations.issn.issn_operations_commands",
+    "build_journal_documents": "ingest.journal_documents",
+    "build_merged_doi_counts": "ingest.doi_counts",
+    "build_retraction_summary": "ingest.retraction_watch",
+    "currently_publishing": "operations.status.status_commands",
+    "date_last_doi": "operations.status.status_commands",
+    "delete_apc_prices": "ingest.apc.apc_commands",
+    "delete_currency_table_values": "ingest.currency.currency",
+    "export_snapshot": "ingest.snapshot",
+    "generate_synthetic_data": "ingest.synthetic_data",
+    "import_apc_elsevier": "ingest.apc.apc_commands",
+    "import_apc_sage": "ingest.apc.apc_commands",
+    "import_apc_springer": "ingest.apc.apc_commands",
+    "import_apc_taylor": "ingest.apc.apc_commands",
+    "import_apc_wiley": "ingest.apc.apc_commands",
+    "import_author_permissions": "ingest.author_permissions",
+    "import_citations": "ingest.citations",
+    "import_currency": "ingest.currency.currency",
+    "import_elsevier": "ingest.subscription.subscription_commands",
+    "import_extension_requests": "ingest.readership",
+    "import_issns": "ingest.issn.issn_commands",
+    "import_locations": "ingest.locations.locations",
+    "import_mini_bundle": "ingest.subscription.subscription_commands",
+    "import_open_access": "ingest.open_access",
+    "import_repositories": "ingest.repositories",
+    "import_retraction_watch": "ingest.retraction_watch",
+    "import_sage": "ingest.subscription.subscription_commands",
+    "import_sample_dois": "ingest.sample_dois",
+    "import_springer_2021": "ingest.subscription.subscription_commands",
+    "import_springer_2022": "ingest.subscription.subscription_commands",
+    "import_tf": "ingest.subscription.subscription_commands",
+    "import_wb": "ingest.subscription.subscription_commands",
+    "ingest_metadata": "ingest.journal_metadata.metadata_commands",
+    "manual_add": "ingest.journals.journals_commands",
+    "merge_issn": "operations.issn.issn_operations_commands",
+    "move_issn": "operations.issn.issn_operations_commands",
+    "process_new_journals": "ingest.journals.journals_commands",
+    "prune_journal_changes": "ingest.journal_changes",
+    "sage_mb": "ingest.subscription.subscription_commands",
+    "set_status_from_spreadsheet": "operations.status.status_commands",
+    "taylor_mb": "ingest.subscription.subscription_commands",
+    "validate_issns": "operations.issn.issn_operations_commands",
+    "wiley_mb": "ingest.subscription.subscription_commands",
+}
+
+
+class LazyAppGroup(AppGroup):
+    """
+    Flask CLI group that imports the module of an ingest or operations command when
+    the command runs. Modules still register their commands with @app.cli.command,
+    but web workers never import them, or the libraries they depend on.
+
+    Add new commands to COMMAND_MODULES.
+    """
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(COMMAND_MODULES))
+
+    def get_command(self, ctx, name):
+        if name not in self.commands and name in COMMAND_MODULES:
+            importlib.import_module(COMMAND_MODULES[name])
+        # runs once the command has committed its changes. Listing and help look up
+        # every command in the same context, the check is registered for the first
+        if not ctx.meta.get("journalsdb.invalidation_check"):
+            ctx.meta["journalsdb.invalidation_check"] = True
+            ctx.call_on_close(fail_on_pending_invalidations)
+        return super().get_command(ctx, name)
+
+
+def fail_on_pending_invalidations():
+    """
+    Fails a command whose data changes were committed, but whose cached responses
+    could not be invalidated, rather than leaving them stale for a day unnoticed.
+    """
+    # caching needs the app, which is created after this module
+    from caching import (
+        INVALIDATION_ATTEMPTS,
+        CacheInvalidationError,
+        apply_pending_invalidations,
+    )
+
+    try:
+        apply_pending_invalidations(INVALIDATION_ATTEMPTS)
+    except CacheInvalidationError as e:
+        raise click.ClickException(
+            "changes were committed, but {}. Clear the response cache once it is "
+            "reachable.".format(e)
+        )
@@ -0,0 +1,128 @@
+import gzip
+import zlib
+
+from flask import request
+
+from app import app
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# smaller bodies are not worth the cpu
+MIN_SIZE = 1024
+COMPRESSIBLE_MIMETYPES = ["application/json", "application/x-ndjson", "text/csv"]
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def supported_encodings():
+    # brotli first, it is smaller at the same speed
+    return ["br", "gzip"] if brotli else ["gzip"]
+
+
+def is_compressible(response):
+    return (
+        response.status_code == 200
+        and response.mimetype in COMPRESSIBLE_MIMETYPES
+        and "Content-Encoding" not in response.headers
+    )
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+
+def negotiate(encodings):
+    """
+    Encoding the client prefers among encodings, None for an uncompressed response.
+    """
+    return request.accept_encodings.best_match(encodings)
+
+
+def add_negotiated_encoding(body, compressed):
+    """
+    Adds the body in the encoding the client prefers to compressed, the bodies served
+    by use_precompressed, unless it is there already. Returns whether it was added.
+    """
+    if len(body) < MIN_SIZE:
+        return False
+    encoding = negotiate(supported_encodings())
+    if not encoding or encoding in compressed:
+        return False
+    compressed[encoding] = compress(body, encoding)
+    return True
+
+
+def use_encoding(response, encoding, body):
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    # the bytes differ from the uncompressed response, the content does not
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def use_precompressed(response, compressed):
+    """
+    Serves the body the client accepts from compressed, as built by
+    add_negotiated_encoding.
+    """
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate(list(compressed))
+    # not modified responses have no body
+    if encoding and response.status_code == 200:
+        use_encoding(response, encoding, compressed[encoding])
+    return response
+
+
+def compress_stream(chunks, encoding):
+    """
+    Compresses a streamed body, flushing the compressor after every chunk so each
+    chunk reaches the client as soon as it is written.
+    """
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        compress_chunk, flush, finish = (
+            compressor.process,
+            compressor.flush,
+            compressor.finish,
+        )
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        compress_chunk, finish = compressor.compress, compressor.flush
+
+        def flush():
+            return compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    for chunk in chunks:
+        compressed = compress_chunk(chunk) + flush()
+        if compressed:
+            yield compressed
+    yield finish()
+
+
+@app.after_request
+def compress_response(response):
+    """
+    Compresses API responses with gzip or brotli, as negotiated with Accept-Encoding.
+    Streamed exports are compressed as they are written.
+    """
+    if not is_compressible(response):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate(supported_encodings())
+    if not encoding:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.iter_encoded(), encoding)
+        response.headers["Content-Encoding"] = encoding
+        response.headers.pop("Content-Length", None)
+    elif response.content_length and response.content_length >= MIN_SIZE:
+        use_encoding(response, encoding, compress(response.get_data(), encoding))
+    return response
@@ -0,0 +1,60 @@
+import decimal
+import enum
+
+from flask import json
+
+from timing import timed
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class PreEncoded:
+    """
+    JSON text that is already encoded, such as a pre-rendered journal document. It is
+    written into the response as it is, without decoding and encoding it again.
+    """
+
+    def __init__(self, json_text):
+        self.json_text = json_text
+
+
+class JSONEncoder(json.JSONEncoder):
+    """
+    Encodes with orjson when it is installed, with the output of Flask's encoder: dates
+    are HTTP dates and prices are strings. orjson only writes compact UTF-8, so
+    pretty printed responses (JSONIFY_PRETTYPRINT_REGULAR) and escaped ones
+    (JSON_AS_ASCII) are encoded by Flask's encoder.
+    """
+
+    @property
+    def uses_orjson(self):
+        return orjson is not None and not self.indent and not self.ensure_ascii
+
+    def default(self, o):
+        if isinstance(o, decimal.Decimal):
+            return str(o)
+        if isinstance(o, enum.Enum):
+            return o.value
+        if isinstance(o, PreEncoded):
+            # decoded, so it is indented and escaped like the rest of the output
+            if not self.uses_orjson:
+                return json.loads(o.json_text)
+            return orjson.Fragment(o.json_text)
+        return super().default(o)
+
+    def encode(self, o):
+        with timed("encode"):
+            return self.encode_json(o)
+
+    def encode_json(self, o):
+        if not self.uses_orjson:
+            return super().encode(o)
+
+        # dates go through default, which encodes them as http dates like Flask
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(o, default=self.default, option=option).decode()
@@ -9,3 +9,10 @@ class APIPaginationError(APIError):
 
     code = 403
     description = "pagination error"
+
+
+class APIBatchError(APIError):
+    """Error when a batch request body is missing or too large."""
+
+    code = 400
+    description = "batch error"
@@ -0,0 +1,24 @@
+import os
+import shutil
+
+# workers write their metrics to files in this directory, so a scrape of /metrics
+# reports every worker, see metrics.py. Set before the workers import the app.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/journalsdb_metrics")
+
+
+def on_starting(server):
+    """
+    Clears the metric files of a previous run.
+    """
+    directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+
+
+def child_exit(server, worker):
+    """
+    Drops the live gauges of a stopped worker, its counters are kept.
+    """
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -2,6 +2,7 @@ import os
 import pandas as pd
 
 from app import app, db
+from caching import invalidate_all
 from models.price import Currency
 
 
@@ -42,6 +43,8 @@ def import_currency():
             currency.acronym = acronym
             currency.text = text
     db.session.commit()
+    # prices are shown with their currency
+    invalidate_all()
 
 
 @app.cli.command("delete_currency_table_values")
@@ -55,3 +58,4 @@ def delete_currency():
     for currency in currencies:
         db.session.delete(currency)
     db.session.commit()
+    invalidate_all()
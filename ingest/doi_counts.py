@@ -0,0 +1,104 @@
+from app import app, db
+from models.versions import queue_journal_versions
+
+# doi counts of each journal and of its previous issn_ls, in previous_issn_ls order
+DOI_SOURCES_SQL = """
+SELECT j.issn_l, 0 AS position, d.dois_by_year
+FROM journals j
+JOIN doi_counts d ON d.issn_l = j.issn_l
+{where}
+UNION ALL
+SELECT j.issn_l, p.position, d.dois_by_year
+FROM journals j
+JOIN issn_metadata m ON m.issn_l = j.issn_l
+CROSS JOIN LATERAL jsonb_array_elements_text(m.previous_issn_ls)
+    WITH ORDINALITY AS p(issn_l, position)
+JOIN doi_counts d ON d.issn_l = p.issn_l
+{where}
+"""
+
+# totals add up every source, while for a year counted by several sources the
+# last previous issn_l wins
+MERGE_SQL = """
+WITH sources AS ({sources}),
+totals AS (
+    SELECT
+        s.issn_l,
+        sum((SELECT coalesce(sum(value::int), 0) FROM jsonb_each_text(s.dois_by_year)))
+            AS total_dois
+    FROM sources s
+    GROUP BY s.issn_l
+),
+years AS (
+    SELECT DISTINCT ON (s.issn_l, y.key) s.issn_l, y.key, y.value
+    FROM sources s
+    CROSS JOIN LATERAL jsonb_each(s.dois_by_year) AS y
+    ORDER BY s.issn_l, y.key, s.position DESC
+),
+merged AS (
+    SELECT
+        t.issn_l,
+        t.total_dois,
+        coalesce(
+            jsonb_object_agg(y.key, y.value) FILTER (WHERE y.key IS NOT NULL), '{{}}'
+        ) AS dois_by_year
+    FROM totals t
+    LEFT JOIN years y ON y.issn_l = t.issn_l
+    GROUP BY t.issn_l, t.total_dois
+),
+deleted AS (
+    DELETE FROM doi_counts_merged dm
+    WHERE dm.issn_l NOT IN (SELECT issn_l FROM merged) {delete_where}
+    RETURNING dm.issn_l
+),
+upserted AS (
+    INSERT INTO doi_counts_merged (issn_l, total_dois, dois_by_year, updated_at)
+    SELECT issn_l, total_dois, dois_by_year, now() at time zone 'utc' FROM merged
+    ON CONFLICT (issn_l) DO UPDATE
+    SET
+        total_dois = excluded.total_dois,
+        dois_by_year = excluded.dois_by_year,
+        updated_at = excluded.updated_at
+    WHERE (doi_counts_merged.total_dois, doi_counts_merged.dois_by_year)
+        IS DISTINCT FROM (excluded.total_dois, excluded.dois_by_year)
+    RETURNING issn_l
+)
+SELECT issn_l FROM deleted
+UNION
+SELECT issn_l FROM upserted;
+"""
+
+
+@app.cli.command("build_merged_doi_counts")
+def build_merged_doi_counts():
+    """
+    Combines the doi counts of every journal with those of its previous issn_ls into
+    the doi_counts_merged table, which total_dois and dois_by_issued_year are read from.
+
+    Run after importing doi counts with: flask build_merged_doi_counts
+    """
+    changed = refresh_merged_doi_counts()
+    db.session.commit()
+    print("merged doi counts of {} journals changed".format(len(changed)))
+
+
+def refresh_merged_doi_counts(issn_ls=None):
+    """
+    Rebuilds the merged doi counts of the journals in issn_ls, or of every journal,
+    with one statement. Returns the issn_ls with changed counts, and queues their
+    journal versions.
+    """
+    if issn_ls is None:
+        where = delete_where = ""
+    else:
+        where = "WHERE j.issn_l = ANY(:issn_ls)"
+        delete_where = "AND dm.issn_l = ANY(:issn_ls)"
+
+    sql = MERGE_SQL.format(
+        sources=DOI_SOURCES_SQL.format(where=where), delete_where=delete_where
+    )
+    changed = [
+        row.issn_l for row in db.session.execute(sql, {"issn_ls": list(issn_ls or [])})
+    ]
+    queue_journal_versions(changed)
+    return changed
@@ -14,6 +14,7 @@ from models.issn import (
     ISSNToISSNL,
     MissingJournal,
 )
+from models.versions import queue_journal_versions
 
 
 UNPAYWALL_ISSNS_URL = "https://api.unpaywall.org/crossref_issns.csv.gz"
@@ -330,8 +331,11 @@ def map_issns_to_issnl():
         where issn_l is not null
         group by issn_l
     ) on conflict (issn_l) do update
-    set issn_org_issns = excluded.issn_org_issns;
+    set issn_org_issns = excluded.issn_org_issns
+    where issn_metadata.issn_org_issns is distinct from excluded.issn_org_issns
+    returning issn_l;
     """
-    db.session.execute(sql)
+    changed = db.session.execute(sql)
+    queue_journal_versions([row.issn_l for row in changed])
     db.session.commit()
     print("map issns in metadata table complete")
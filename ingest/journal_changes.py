@@ -0,0 +1,23 @@
+import datetime
+
+import click
+
+from app import app, db
+from models.versions import JournalChange
+
+
+@app.cli.command("prune_journal_changes")
+@click.option("--days", type=int, default=90, help="Days of changes to keep.")
+def prune_journal_changes(days):
+    """
+    Deletes journal changes older than --days from the journal_changes table. Mirrors
+    that last synced before then need to download every journal again.
+
+    Run daily with: flask prune_journal_changes --days 90
+    """
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+    deleted = JournalChange.query.filter(JournalChange.changed_at < cutoff).delete(
+        synchronize_session=False
+    )
+    db.session.commit()
+    print("deleted {} journal changes older than {}".format(deleted, cutoff))
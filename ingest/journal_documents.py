@@ -0,0 +1,122 @@
+import datetime
+
+import click
+from flask import json
+from sqlalchemy.orm import selectinload
+
+from app import app, db
+from models.journal import Journal, JournalDocument
+from models.versions import JournalVersion
+from schemas.compiled import dump
+from schemas.schema_combined import JournalDetailSchema, JournalListSchema
+from utils import journal_load_options
+
+BATCH_SIZE = 500
+
+
+@app.cli.command("build_journal_documents")
+@click.option("--full", is_flag=True, help="Render every journal.")
+@click.option("--base_url", default="https://api.journalsdb.org")
+def build_journal_documents(full, base_url):
+    """
+    Renders the detail and list JSON of each journal into the journal_documents table,
+    so the API can serve a journal with one primary key lookup.
+
+    Only journals without a document or changed since their document was rendered,
+    according to their journal version, are rebuilt. Use --full after schema changes.
+
+    Run after imports with: flask build_journal_documents
+    """
+    delete_orphaned_documents()
+
+    if full:
+        journal_ids = [j.id for j in db.session.query(Journal.id).all()]
+    else:
+        journal_ids = get_touched_journal_ids()
+    print("rendering {} journal documents".format(len(journal_ids)))
+
+    # detail documents contain absolute urls, so render them for the public site
+    with app.test_request_context(base_url=base_url):
+        for i in range(0, len(journal_ids), BATCH_SIZE):
+            render_documents(journal_ids[i : i + BATCH_SIZE])
+            print("rendered {} documents".format(min(i + BATCH_SIZE, len(journal_ids))))
+
+
+def get_touched_journal_ids():
+    """
+    Journals with no document, or with a newer version than their document.
+    """
+    sql = """
+    SELECT j.id
+    FROM journals j
+    LEFT JOIN journal_versions v ON v.issn_l = j.issn_l
+    LEFT JOIN journal_documents d ON d.issn_l = j.issn_l
+    WHERE d.issn_l IS NULL OR d.version <> coalesce(v.version, 0)
+    ORDER BY j.id;
+    """
+    return [row.id for row in db.session.execute(sql)]
+
+
+def render_documents(journal_ids):
+    # versions are read first, so changes made while rendering are picked up by the
+    # next build and the stale documents are not served in the meantime
+    rendered_at = datetime.datetime.utcnow()
+    versions = dict(
+        db.session.query(JournalVersion.issn_l, JournalVersion.version)
+        .join(Journal, Journal.issn_l == JournalVersion.issn_l)
+        .filter(Journal.id.in_(journal_ids))
+        .all()
+    )
+
+    journals = (
+        Journal.query.options(
+            *journal_load_options(), selectinload(Journal.retraction_summaries)
+        )
+        .filter(Journal.id.in_(journal_ids))
+        .all()
+    )
+
+    documents = {
+        d.issn_l: d
+        for d in JournalDocument.query.filter(
+            JournalDocument.issn_l.in_([j.issn_l for j in journals])
+        ).all()
+    }
+    detail_schema = JournalDetailSchema()
+    list_schema = JournalListSchema()
+
+    for journal in journals:
+        detail_json = json.dumps(dump(detail_schema, journal))
+        list_json = json.dumps(dump(list_schema, journal))
+        # journals without a version get documents that are never served
+        version = versions.get(journal.issn_l, 0)
+        document = documents.get(journal.issn_l)
+        if document:
+            document.version = version
+            document.detail_json = detail_json
+            document.list_json = list_json
+            document.rendered_at = rendered_at
+        else:
+            db.session.add(
+                JournalDocument(
+                    issn_l=journal.issn_l,
+                    version=version,
+                    detail_json=detail_json,
+                    list_json=list_json,
+                    rendered_at=rendered_at,
+                )
+            )
+    db.session.commit()
+
+
+def delete_orphaned_documents():
+    """
+    Removes documents of journals that were deleted, for example by merge_issn.
+    """
+    db.session.execute(
+        """
+        DELETE FROM journal_documents d
+        WHERE NOT EXISTS (SELECT 1 FROM journals j WHERE j.issn_l = d.issn_l);
+        """
+    )
+    db.session.commit()
@@ -3,6 +3,7 @@ import os
 import pandas as pd
 
 from app import app, db
+from caching import invalidate_all
 from models.location import Country, Continent
 
 
@@ -48,3 +49,5 @@ def import_locations():
             db.session.flush()
 
     db.session.commit()
+    # prices are shown with their country and region
+    invalidate_all()
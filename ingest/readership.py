@@ -1,7 +1,7 @@
 import pandas as pd
 
 from app import app, db
-from ingest.utils import find_journal
+from ingest.utils import find_journals
 from models.usage import ExtensionRequests
 
 
@@ -21,12 +21,13 @@ def import_extension_requests():
     """
     url = "https://api.unpaywall.org/extension_requests.csv.gz"
     df = pd.read_csv(url, compression="gzip", keep_default_na=False)
+    journals = find_journals(df.loc[df["issn_l"] != "", "issn_l"])
 
     for index, row in df.iterrows():
         if not valid_extension_data(row):
             continue
 
-        journal = find_journal(row["issn_l"])
+        journal = journals.get(row["issn_l"])
         if not journal:
             print("journal with issn-l {} not found.".format(row["issn_l"]))
         elif timestamp_exists(journal, row):
@@ -8,6 +8,20 @@ from sqlalchemy import exc, func
 from app import app, db
 from models.journal import Journal
 from models.usage import RetractionSummary, RetractionWatch
+from models.versions import queue_journal_versions
+
+# rows of the issn_ls, by their current or their mapped issn_l, get the issn_l their
+# issn maps to now, or none
+REMAP_SQL = """
+UPDATE retraction_summary r
+SET issn_l = m.issn_l
+FROM retraction_summary old
+LEFT JOIN issn_to_issnl m ON m.issn = old.issn
+WHERE old.id = r.id
+    AND (old.issn_l = ANY(:issn_ls) OR m.issn_l = ANY(:issn_ls))
+    AND old.issn_l IS DISTINCT FROM m.issn_l
+RETURNING old.issn_l AS old_issn_l, r.issn_l
+"""
 
 
 @app.cli.command("import_retraction_watch")
@@ -117,7 +131,8 @@ def get_recent_file():
 @app.cli.command("build_retraction_summary")
 def build_retraction_summary():
     """
-    Goes through retraction watch data and builds a summary table that can be used to calculate a retraction percentage.
+    Goes through retraction watch data and builds a summary table with the retraction
+    percentage of each journal and year, keyed by issn_l.
 
     Run with: flask build_retraction_summary
     """
@@ -136,8 +151,10 @@ def build_retraction_summary():
         .all()
     )
 
+    journals = Journal.find_many_by_issn(list({r.issn for r in retractions if r.issn}))
+
     for r in retractions:
-        journal = Journal.find_by_issn(r.issn)
+        journal = journals.get(r.issn)
         if not journal:
             continue
         metadata = (
@@ -156,6 +173,9 @@ def build_retraction_summary():
 
         for year, num_dois in dois_by_year:
             if year == r.published_year:
+                percent_retracted = RetractionSummary.calculate_percent_retracted(
+                    r.count, num_dois
+                )
                 entry = (
                     db.session.query(RetractionSummary)
                     .filter_by(issn=r.issn, year=year)
@@ -164,10 +184,12 @@ def build_retraction_summary():
                 if not entry:
                     s = RetractionSummary(
                         issn=r.issn,
+                        issn_l=journal.issn_l,
                         journal=r.journal,
                         year=r.published_year,
                         retractions=r.count,
                         num_dois=num_dois,
+                        percent_retracted=percent_retracted,
                     )
                     try:
                         db.session.add(s)
@@ -175,12 +197,27 @@ def build_retraction_summary():
                     except exc.IntegrityError:
                         db.session.rollback()
                 else:
+                    entry.issn_l = journal.issn_l
                     entry.journal = r.journal
                     entry.retractions = r.count
                     entry.num_dois = num_dois
+                    entry.percent_retracted = percent_retracted
                     db.session.commit()
                     print(
                         "Updating issn: {} with count: {} and num_dois: {}".format(
                             entry.issn, r.count, num_dois
                         )
                     )
+
+
+def remap_retraction_summaries(issn_ls):
+    """
+    Keys the retraction summaries of issns that were merged or moved between the
+    journals in issn_ls by the issn_l they map to now, and queues the versions of
+    the journals they moved from and to. Returns the number of rows moved.
+    """
+    rows = db.session.execute(REMAP_SQL, {"issn_ls": list(issn_ls)}).fetchall()
+    queue_journal_versions(
+        [row.old_issn_l for row in rows] + [row.issn_l for row in rows]
+    )
+    return len(rows)
@@ -0,0 +1,285 @@
+import csv
+import datetime
+import gzip
+import hashlib
+import io
+import json
+import os
+
+import click
+from sqlalchemy import text
+
+from app import app, db
+
+CHUNK_SIZE = 10000
+MANIFEST_NAME = "manifest.json"
+
+# flat tables of the snapshot, each read with one query in (name, type) columns
+SNAPSHOT_TABLES = {
+    "journals": (
+        """
+        SELECT
+            j.id, j.issn_l, j.title, p.name AS publisher, j.status::text AS status,
+            j.status_as_of, dm.total_dois, j.date_last_doi, j.created_at, j.updated_at
+        FROM journals j
+        LEFT JOIN publishers p ON p.id = j.publisher_id
+        LEFT JOIN doi_counts_merged dm ON dm.issn_l = j.issn_l
+        ORDER BY j.id
+        """,
+        [
+            ("id", "int32"),
+            ("issn_l", "string"),
+            ("title", "string"),
+            ("publisher", "string"),
+            ("status", "string"),
+            ("status_as_of", "timestamp"),
+            ("total_dois", "int32"),
+            ("date_last_doi", "timestamp"),
+            ("created_at", "timestamp"),
+            ("updated_at", "timestamp"),
+        ],
+    ),
+    "journal_issns": (
+        """
+        SELECT t.issn_l, t.issn
+        FROM issn_to_issnl t
+        JOIN journals j ON j.issn_l = t.issn_l
+        ORDER BY t.issn_l, t.issn
+        """,
+        [("issn_l", "string"), ("issn", "string")],
+    ),
+    "subscription_prices": (
+        """
+        SELECT
+            j.issn_l, sp.year, sp.price, c.acronym AS currency, r.name AS region,
+            co.iso AS country, sp.fte_from, sp.fte_to
+        FROM subscription_price sp
+        JOIN journals j ON j.id = sp.journal_id
+        JOIN currency c ON c.id = sp.currency_id
+        LEFT JOIN regions r ON r.id = sp.region_id
+        LEFT JOIN countries co ON co.id = sp.country_id
+        ORDER BY j.issn_l, sp.year, sp.id
+        """,
+        [
+            ("issn_l", "string"),
+            ("year", "int32"),
+            ("price", "decimal"),
+            ("currency", "string"),
+            ("region", "string"),
+            ("country", "string"),
+            ("fte_from", "int32"),
+            ("fte_to", "int32"),
+        ],
+    ),
+    "apc_prices": (
+        """
+        SELECT
+            j.issn_l, ap.year, ap.price, c.acronym AS currency, r.name AS region,
+            co.iso AS country, ap.apc_waived, ap.discounted, ap.discount_notes
+        FROM apc_price ap
+        JOIN journals j ON j.id = ap.journal_id
+        JOIN currency c ON c.id = ap.currency_id
+        LEFT JOIN regions r ON r.id = ap.region_id
+        LEFT JOIN countries co ON co.id = ap.country_id
+        ORDER BY j.issn_l, ap.year, ap.id
+        """,
+        [
+            ("issn_l", "string"),
+            ("year", "int32"),
+            ("price", "decimal"),
+            ("currency", "string"),
+            ("region", "string"),
+            ("country", "string"),
+            ("apc_waived", "bool"),
+            ("discounted", "bool"),
+            ("discount_notes", "string"),
+        ],
+    ),
+    "open_access": (
+        """
+        SELECT
+            oa.issn_l, oa.year, oa.num_dois, oa.num_open, oa.num_gold, oa.num_green,
+            oa.num_bronze, oa.num_hybrid, oa.open_rate, oa.gold_rate, oa.green_rate,
+            oa.bronze_rate, oa.hybrid_rate, oa.is_gold_journal, oa.is_in_doaj
+        FROM open_access oa
+        JOIN journals j ON j.issn_l = oa.issn_l
+        ORDER BY oa.issn_l, oa.year
+        """,
+        [
+            ("issn_l", "string"),
+            ("year", "int32"),
+            ("num_dois", "int32"),
+            ("num_open", "int32"),
+            ("num_gold", "int32"),
+            ("num_green", "int32"),
+            ("num_bronze", "int32"),
+            ("num_hybrid", "int32"),
+            ("open_rate", "float64"),
+            ("gold_rate", "float64"),
+            ("green_rate", "float64"),
+            ("bronze_rate", "float64"),
+            ("hybrid_rate", "float64"),
+            ("is_gold_journal", "bool"),
+            ("is_in_doaj", "bool"),
+        ],
+    ),
+    "doi_counts": (
+        """
+        SELECT dm.issn_l, y.key::int AS year, y.value::int AS num_dois
+        FROM doi_counts_merged dm
+        JOIN journals j ON j.issn_l = dm.issn_l
+        CROSS JOIN LATERAL jsonb_each_text(dm.dois_by_year) AS y
+        ORDER BY dm.issn_l, year
+        """,
+        [("issn_l", "string"), ("year", "int32"), ("num_dois", "int32")],
+    ),
+    "repositories": (
+        """
+        SELECT
+            r.issn_l, r.endpoint_id, r.repository_name, r.institution_name,
+            r.home_page, r.pmh_url, r.num_articles
+        FROM repositories r
+        JOIN journals j ON j.issn_l = r.issn_l
+        ORDER BY r.issn_l, r.endpoint_id
+        """,
+        [
+            ("issn_l", "string"),
+            ("endpoint_id", "string"),
+            ("repository_name", "string"),
+            ("institution_name", "string"),
+            ("home_page", "string"),
+            ("pmh_url", "string"),
+            ("num_articles", "int32"),
+        ],
+    ),
+}
+
+
+@app.cli.command("export_snapshot")
+@click.option("--directory", default="snapshot", help="Directory to write files to.")
+@click.option("--chunk_size", type=int, default=CHUNK_SIZE)
+def export_snapshot(directory, chunk_size):
+    """
+    Writes journals, journal issns, subscription prices, apc prices, open access by
+    year, doi counts by year and repositories as flat tables, each to a parquet and a
+    gzipped csv file, with row counts and sha256 checksums in manifest.json.
+
+    Rows are streamed from one consistent database snapshot in chunks, so memory use
+    does not grow with the catalog.
+
+    Run with: flask export_snapshot --directory snapshot
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest = {
+        "created_at": datetime.datetime.utcnow().isoformat(),
+        "tables": {},
+    }
+
+    connection = db.engine.connect().execution_options(
+        isolation_level="REPEATABLE READ"
+    )
+    try:
+        with connection.begin():
+            for name, (sql, columns) in SNAPSHOT_TABLES.items():
+                manifest["tables"][name] = export_table(
+                    connection, directory, name, sql, columns, chunk_size
+                )
+                print(
+                    "exported {} rows of {}".format(
+                        manifest["tables"][name]["rows"], name
+                    )
+                )
+    finally:
+        connection.close()
+
+    # written last, a snapshot without a manifest is incomplete
+    with open(os.path.join(directory, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def export_table(connection, directory, name, sql, columns, chunk_size):
+    """
+    Streams the rows of sql into name.parquet and name.csv.gz, returns the manifest
+    entry of the table.
+    """
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema(columns)
+    parquet_path = os.path.join(directory, "{}.parquet".format(name))
+    csv_path = os.path.join(directory, "{}.csv.gz".format(name))
+
+    # server side cursor, only one chunk of rows is held at a time
+    result = connection.execution_options(stream_results=True).execute(text(sql))
+    rows_written = 0
+    parquet_writer = pq.ParquetWriter(parquet_path, schema)
+    try:
+        # no file name or timestamp in the gzip header, so checksums are reproducible
+        with open(csv_path, "wb") as csv_file, gzip.GzipFile(
+            fileobj=csv_file, mode="wb", filename="", mtime=0
+        ) as gz, io.TextIOWrapper(gz, encoding="utf-8", newline="") as csv_text:
+            csv_writer = csv.writer(csv_text)
+            csv_writer.writerow([column for column, _ in columns])
+            while True:
+                rows = result.fetchmany(chunk_size)
+                if not rows:
+                    break
+                parquet_writer.write_table(arrow_table(rows, schema))
+                csv_writer.writerows([csv_row(row) for row in rows])
+                rows_written += len(rows)
+    finally:
+        parquet_writer.close()
+
+    return {
+        "rows": rows_written,
+        "columns": [{"name": column, "type": type_} for column, type_ in columns],
+        "files": [
+            file_entry(directory, parquet_path, "parquet"),
+            file_entry(directory, csv_path, "csv.gz"),
+        ],
+    }
+
+
+def arrow_schema(columns):
+    import pyarrow as pa
+
+    types = {
+        "bool": pa.bool_(),
+        "decimal": pa.decimal128(10, 2),
+        "float64": pa.float64(),
+        "int32": pa.int32(),
+        "string": pa.string(),
+        "timestamp": pa.timestamp("us"),
+    }
+    return pa.schema([(column, types[type_]) for column, type_ in columns])
+
+
+def arrow_table(rows, schema):
+    import pyarrow as pa
+
+    values = list(zip(*rows))
+    arrays = [pa.array(values[i], type=field.type) for i, field in enumerate(schema)]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def csv_row(row):
+    return [
+        value.isoformat() if isinstance(value, datetime.datetime) else value
+        for value in row
+    ]
+
+
+def file_entry(directory, path, file_format):
+    return {
+        "path": os.path.relpath(path, directory),
+        "format": file_format,
+        "bytes": os.path.getsize(path),
+        "sha256": file_checksum(path),
+    }
+
+
+def file_checksum(path):
+    checksum = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            checksum.update(block)
+    return checksum.hexdigest()
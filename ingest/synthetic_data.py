@@ -0,0 +1,683 @@
+import csv
+import io
+import json
+import random
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import click
+
+from app import app, db
+from caching import invalidate_all
+from ingest.doi_counts import refresh_merged_doi_counts
+from ingest.seed_data import import_seed_data
+from models.journal import Journal
+from models.usage import RetractionSummary
+
+COPY_CHUNK_ROWS = 50000
+# synthetic issns are numbered from here, above the issns of the seed data, up to
+# the 7 digit limit of issn()
+FIRST_ISSN_NUMBER = 7000000
+ISSN_NUMBERS = 10000000 - FIRST_ISSN_NUMBER
+# issn_l, a second issn and up to 3 previous issn_ls
+MAX_ISSNS_PER_JOURNAL = 5
+OA_YEARS = range(2010, 2022)
+PRICE_YEARS = range(2019, 2023)
+REPOSITORY_COUNT = 2000
+
+TITLE_WORDS = [
+    "Advances",
+    "Agricultural",
+    "Applied",
+    "Biology",
+    "Chemistry",
+    "Clinical",
+    "Computational",
+    "Ecology",
+    "Economics",
+    "Education",
+    "Engineering",
+    "Environmental",
+    "European",
+    "Finance",
+    "Genetics",
+    "History",
+    "International",
+    "Linguistics",
+    "Management",
+    "Materials",
+    "Mathematics",
+    "Medicine",
+    "Nursing",
+    "Physics",
+    "Psychology",
+    "Research",
+    "Review",
+    "Science",
+    "Sociology",
+    "Studies",
+]
+STATUSES = ["publishing"] * 14 + ["ceased"] * 2 + ["renamed", "unknown", "unknown"]
+CURRENCIES = [
+    ("$", "US Dollar", "USD"),
+    ("€", "Euro", "EUR"),
+    ("£", "British Pound", "GBP"),
+]
+COUNTRIES = [
+    ("United Kingdom", "GB", "GBR"),
+    ("Germany", "DE", "DEU"),
+    ("Japan", "JP", "JPN"),
+    ("Canada", "CA", "CAN"),
+    ("Australia", "AU", "AUS"),
+]
+REGIONS = ["USA", "Europe", "UK", "Rest of World"]
+
+SyntheticJournal = namedtuple(
+    "SyntheticJournal", ["id", "issn_l", "issns", "previous_issn_ls", "publisher_id"]
+)
+
+
+@app.cli.command("generate_synthetic_data")
+@click.option("--journals", type=int, default=150000, help="Journals to create.")
+@click.option("--issns", type=int, default=2000000, help="issn_to_issnl rows.")
+@click.option("--seed", type=int, default=1, help="Same seed, same data.")
+def generate_synthetic_data(journals, issns, seed):
+    """
+    Fills an empty database with the seed data the tests use, from seed_data.py, and a
+    synthetic catalog at production volumes, for benchmarks: journals with print,
+    electronic and previous issn_ls, open access and doi counts by year, subscription
+    and apc prices in several regions and currencies, mini bundles and retraction
+    summaries.
+
+    Rows are loaded with COPY, 150k journals take a few minutes.
+
+    Run with: flask generate_synthetic_data --journals 150000 --issns 2000000
+    """
+    if not 0 < journals <= ISSN_NUMBERS // MAX_ISSNS_PER_JOURNAL:
+        raise click.BadParameter(
+            "must be between 1 and {}".format(ISSN_NUMBERS // MAX_ISSNS_PER_JOURNAL),
+            param_hint="--journals",
+        )
+    if not 0 <= issns <= ISSN_NUMBERS:
+        raise click.BadParameter(
+            "must be between 0 and {}".format(ISSN_NUMBERS), param_hint="--issns"
+        )
+    if db.session.query(Journal.id).first():
+        raise click.ClickException("synthetic data needs an empty database")
+
+    import_seed_data()
+    cursor = db.session.connection().connection.cursor()
+    generator = SyntheticData(cursor, seed)
+    generator.load(journals, issns)
+
+    # doi counts are merged and versions created with the same SQL as imports use
+    refresh_merged_doi_counts()
+    create_journal_versions()
+    reset_sequences(cursor)
+    db.session.commit()
+    db.session.execute("ANALYZE")
+    db.session.commit()
+    invalidate_all()
+    print("loaded {} synthetic journals".format(journals))
+
+
+def issn(number):
+    """
+    ISSN with a valid check digit for a number below 10 million.
+    """
+    digits = "{:07d}".format(number)
+    total = sum(int(digit) * weight for digit, weight in zip(digits, range(8, 1, -1)))
+    check = (11 - total % 11) % 11
+    return "{}-{}{}".format(digits[:4], digits[4:], "X" if check == 10 else check)
+
+
+def copy_rows(cursor, table, columns, rows):
+    """
+    Loads rows into table with COPY in chunks, so no more than one chunk is held in
+    memory. Returns the number of rows loaded.
+    """
+    sql = "COPY {} ({}) FROM STDIN WITH (FORMAT csv, ENCODING 'UTF8')".format(
+        table, ", ".join(columns)
+    )
+    count = 0
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(
+            [json.dumps(v) if isinstance(v, (dict, list)) else v for v in row]
+        )
+        count += 1
+        if count % COPY_CHUNK_ROWS == 0:
+            copy_buffer(cursor, sql, buffer)
+    copy_buffer(cursor, sql, buffer)
+    print("copied {} rows into {}".format(count, table))
+    return count
+
+
+def copy_buffer(cursor, sql, buffer):
+    # bytes, so the client encoding of the connection does not matter
+    cursor.copy_expert(sql, io.BytesIO(buffer.getvalue().encode("utf-8")))
+    buffer.seek(0)
+    buffer.truncate()
+
+
+def next_id(cursor, table):
+    cursor.execute("SELECT coalesce(max(id), 0) + 1 FROM {}".format(table))
+    return cursor.fetchone()[0]
+
+
+def create_journal_versions():
+    """
+    Version 1 and a journal change for every journal without a version.
+    """
+    db.session.execute(
+        """
+        WITH created AS (
+            INSERT INTO journal_versions (issn_l, version, updated_at)
+            SELECT issn_l, 1, now() at time zone 'utc' FROM journals
+            ON CONFLICT (issn_l) DO NOTHING
+            RETURNING issn_l, version, updated_at
+        )
+        INSERT INTO journal_changes (issn_l, version, deleted, changed_at)
+        SELECT issn_l, version, false, updated_at FROM created;
+        """
+    )
+
+
+def reset_sequences(cursor):
+    """
+    Moves id sequences past the ids loaded with COPY.
+    """
+    for table in [
+        "apc_price",
+        "countries",
+        "currency",
+        "journals",
+        "mini_bundle_price",
+        "mini_bundles",
+        "publishers",
+        "regions",
+        "retraction_summary",
+        "subscription_price",
+    ]:
+        cursor.execute(
+            "SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+            "(SELECT coalesce(max(id), 1) FROM {}))".format(table),
+            [table],
+        )
+
+
+class SyntheticData:
+    """
+    Builds the synthetic catalog table by table. Each table is generated with its own
+    random generator, so the data only depends on the seed and the volumes.
+    """
+
+    def __init__(self, cursor, seed):
+        self.cursor = cursor
+        self.seed = seed
+
+    def random(self, table):
+        return random.Random("{}-{}".format(self.seed, table))
+
+    def load(self, journal_count, issn_count):
+        self.load_reference_data()
+        self.load_publishers(max(journal_count // 50, 1))
+        self.journals = self.plan_journals(journal_count)
+        self.load_issns(issn_count)
+        self.load_journals()
+        self.load_open_access()
+        self.load_doi_counts()
+        self.load_subscription_prices()
+        self.load_apc_prices()
+        self.load_mini_bundles()
+        self.load_retraction_summaries()
+        self.load_repositories()
+
+    def load_reference_data(self):
+        first_currency = next_id(self.cursor, "currency")
+        self.currency_ids = list(
+            range(first_currency, first_currency + len(CURRENCIES))
+        )
+        copy_rows(
+            self.cursor,
+            "currency",
+            ["id", "symbol", "text", "acronym"],
+            [(i, *c) for i, c in zip(self.currency_ids, CURRENCIES)],
+        )
+
+        first_country = next_id(self.cursor, "countries")
+        self.country_ids = list(range(first_country, first_country + len(COUNTRIES)))
+        copy_rows(
+            self.cursor,
+            "countries",
+            ["id", "name", "iso", "iso3"],
+            [(i, *c) for i, c in zip(self.country_ids, COUNTRIES)],
+        )
+
+        first_region = next_id(self.cursor, "regions")
+        self.region_ids = list(range(first_region, first_region + len(REGIONS)))
+        copy_rows(
+            self.cursor,
+            "regions",
+            ["id", "name"],
+            [(i, name) for i, name in zip(self.region_ids, REGIONS)],
+        )
+
+    def load_publishers(self, count):
+        rng = self.random("publishers")
+        first_id = next_id(self.cursor, "publishers")
+        self.publisher_ids = list(range(first_id, first_id + count))
+        copy_rows(
+            self.cursor,
+            "publishers",
+            ["id", "name", "publisher_synonyms", "uuid"],
+            (
+                (
+                    publisher_id,
+                    "Synthetic Publisher {}".format(publisher_id),
+                    ["Synthetic {}".format(publisher_id)]
+                    if rng.random() < 0.2
+                    else None,
+                    "synthetic-publisher-{}".format(publisher_id),
+                )
+                for publisher_id in self.publisher_ids
+            ),
+        )
+
+    def plan_journals(self, count):
+        """
+        issn_l, print and electronic issns, previous issn_ls and publisher of each
+        journal. A few publishers have most of the journals, as in production.
+        """
+        rng = self.random("journals")
+        first_id = next_id(self.cursor, "journals")
+        self.issn_number = FIRST_ISSN_NUMBER
+        journals = []
+        for journal_id in range(first_id, first_id + count):
+            issns = [self.next_issn()]
+            if rng.random() < 0.7:
+                issns.append(self.next_issn())
+            previous_issn_ls = []
+            if rng.random() < 0.1:
+                previous_issn_ls = [self.next_issn() for _ in range(rng.randint(1, 3))]
+            publisher = int(len(self.publisher_ids) * rng.random() ** 3)
+            journals.append(
+                SyntheticJournal(
+                    journal_id,
+                    issns[0],
+                    issns,
+                    previous_issn_ls,
+                    self.publisher_ids[publisher],
+                )
+            )
+        return journals
+
+    def next_issn(self):
+        number = self.issn_number
+        self.issn_number += 1
+        return issn(number)
+
+    def load_issns(self, issn_count):
+        def mappings():
+            count = 0
+            for journal in self.journals:
+                for i in journal.issns + journal.previous_issn_ls:
+                    yield i, journal.issn_l
+                    count += 1
+            # issn_ls of serials that are not journals map to themselves
+            while count < issn_count:
+                i = self.next_issn()
+                yield i, i
+                count += 1
+
+        copy_rows(self.cursor, "issn_to_issnl", ["issn", "issn_l"], mappings())
+        copy_rows(
+            self.cursor,
+            "issn_metadata",
+            ["issn_l", "issn_org_issns", "previous_issn_ls"],
+            ((j.issn_l, j.issns, j.previous_issn_ls or None) for j in self.journals),
+        )
+
+    def load_journals(self):
+        rng = self.random("journal_rows")
+        start = datetime(2020, 1, 1)
+
+        def rows():
+            for journal in self.journals:
+                title = "Journal of {} {}".format(*rng.sample(TITLE_WORDS, 2))
+                status = rng.choice(STATUSES)
+                last_doi = start + timedelta(days=rng.randint(0, 700))
+                yield (
+                    journal.id,
+                    journal.issn_l,
+                    title,
+                    ["{} Letters".format(title)] if rng.random() < 0.05 else None,
+                    journal.publisher_id,
+                    status,
+                    last_doi if status != "unknown" else None,
+                    last_doi,
+                    "synthetic-journal-{}".format(journal.id),
+                    False,
+                    start + timedelta(seconds=journal.id),
+                )
+
+        copy_rows(
+            self.cursor,
+            "journals",
+            [
+                "id",
+                "issn_l",
+                "title",
+                "other_titles",
+                "publisher_id",
+                "status",
+                "status_as_of",
+                "date_last_doi",
+                "uuid",
+                "is_modified_title",
+                "created_at",
+            ],
+            rows(),
+        )
+
+    def load_open_access(self):
+        rng = self.random("open_access")
+
+        def rows():
+            for journal in self.journals:
+                if rng.random() > 0.6:
+                    continue
+                gold = rng.random() < 0.15
+                for year in OA_YEARS[rng.randint(0, len(OA_YEARS) - 1) :]:
+                    num_dois = rng.randint(5, 800)
+                    num_gold = num_dois if gold else 0
+                    num_green = rng.randint(0, num_dois - num_gold)
+                    num_hybrid = 0 if gold else rng.randint(0, num_dois - num_green)
+                    num_bronze = rng.randint(
+                        0, num_dois - num_gold - num_green - num_hybrid
+                    )
+                    num_open = num_gold + num_green + num_hybrid + num_bronze
+                    yield (
+                        journal.issn_l,
+                        year,
+                        num_dois,
+                        num_open,
+                        num_gold,
+                        num_green,
+                        num_bronze,
+                        num_hybrid,
+                        num_open / num_dois,
+                        num_gold / num_dois,
+                        num_green / num_dois,
+                        num_bronze / num_dois,
+                        num_hybrid / num_dois,
+                        gold,
+                        gold and rng.random() < 0.8,
+                    )
+
+        copy_rows(
+            self.cursor,
+            "open_access",
+            [
+                "issn_l",
+                "year",
+                "num_dois",
+                "num_open",
+                "num_gold",
+                "num_green",
+                "num_bronze",
+                "num_hybrid",
+                "open_rate",
+                "gold_rate",
+                "green_rate",
+                "bronze_rate",
+                "hybrid_rate",
+                "is_gold_journal",
+                "is_in_doaj",
+            ],
+            rows(),
+        )
+
+    def load_doi_counts(self):
+        """
+        Counts of the current issn_l and older counts of each previous issn_l, which
+        the merged doi counts add up.
+        """
+        rng = self.random("doi_counts")
+
+        def counts(years):
+            return {str(year): rng.randint(1, 400) for year in years}
+
+        def rows():
+            for journal in self.journals:
+                if rng.random() < 0.8:
+                    yield journal.issn_l, counts(range(rng.randint(2012, 2020), 2022))
+                for previous in journal.previous_issn_ls:
+                    yield previous, counts(range(rng.randint(1995, 2005), 2012))
+
+        copy_rows(self.cursor, "doi_counts", ["issn_l", "dois_by_year"], rows())
+
+    def load_subscription_prices(self):
+        rng = self.random("subscription_price")
+        first_id = next_id(self.cursor, "subscription_price")
+
+        def rows():
+            price_id = first_id
+            for journal in self.journals:
+                if rng.random() > 0.3:
+                    continue
+                regions = rng.sample(range(len(REGIONS)), rng.randint(1, 3))
+                banded = rng.random() < 0.3
+                base = rng.randint(200, 6000)
+                for year in PRICE_YEARS:
+                    for region in regions:
+                        bands = [(1, 1000), (1001, 5000)] if banded else [(None, None)]
+                        for band, (fte_from, fte_to) in enumerate(bands):
+                            yield (
+                                price_id,
+                                journal.id,
+                                round(base * (1 + 0.04 * (year - 2019) + band), 2),
+                                self.currency_ids[min(region, 2)],
+                                None,
+                                self.region_ids[region],
+                                fte_from,
+                                fte_to,
+                                year,
+                            )
+                            price_id += 1
+
+        copy_rows(
+            self.cursor,
+            "subscription_price",
+            [
+                "id",
+                "journal_id",
+                "price",
+                "currency_id",
+                "country_id",
+                "region_id",
+                "fte_from",
+                "fte_to",
+                "year",
+            ],
+            rows(),
+        )
+
+    def load_apc_prices(self):
+        rng = self.random("apc_price")
+        first_id = next_id(self.cursor, "apc_price")
+
+        def rows():
+            price_id = first_id
+            for journal in self.journals:
+                if rng.random() > 0.4:
+                    continue
+                currencies = rng.sample(self.currency_ids, rng.randint(1, 3))
+                base = rng.randint(500, 4000)
+                for year in PRICE_YEARS:
+                    for currency_id in currencies:
+                        yield (
+                            price_id,
+                            journal.id,
+                            base + 100 * (year - 2019),
+                            currency_id,
+                            rng.choice(self.country_ids)
+                            if rng.random() < 0.1
+                            else None,
+                            year,
+                            rng.random() < 0.02,
+                            False,
+                        )
+                        price_id += 1
+
+        copy_rows(
+            self.cursor,
+            "apc_price",
+            [
+                "id",
+                "journal_id",
+                "price",
+                "currency_id",
+                "country_id",
+                "year",
+                "apc_waived",
+                "discounted",
+            ],
+            rows(),
+        )
+
+    def load_mini_bundles(self):
+        """
+        Bundles of 5 to 30 journals of one publisher, with yearly prices.
+        """
+        rng = self.random("mini_bundles")
+        journals_by_publisher = {}
+        for journal in self.journals:
+            journals_by_publisher.setdefault(journal.publisher_id, []).append(journal)
+        publishers = [p for p, j in journals_by_publisher.items() if len(j) >= 10]
+
+        bundles = []
+        bundle_id = next_id(self.cursor, "mini_bundles")
+        for _ in range(len(self.journals) // 500):
+            if not publishers:
+                break
+            publisher_id = rng.choice(publishers)
+            journals = journals_by_publisher[publisher_id]
+            size = rng.randint(5, min(30, len(journals)))
+            bundles.append((bundle_id, publisher_id, rng.sample(journals, size)))
+            bundle_id += 1
+
+        copy_rows(
+            self.cursor,
+            "mini_bundles",
+            ["id", "name", "publisher_id"],
+            (
+                (i, "Synthetic Package {}".format(i), publisher_id)
+                for i, publisher_id, _ in bundles
+            ),
+        )
+        copy_rows(
+            self.cursor,
+            "mini_bundle_journals",
+            ["mini_bundle_id", "journal_id"],
+            ((i, j.id) for i, _, journals in bundles for j in journals),
+        )
+
+        first_price_id = next_id(self.cursor, "mini_bundle_price")
+
+        def prices():
+            price_id = first_price_id
+            for i, _, journals in bundles:
+                for year in PRICE_YEARS:
+                    yield (
+                        price_id,
+                        i,
+                        len(journals) * 900 + 50 * (year - 2019),
+                        self.currency_ids[0],
+                        self.region_ids[0],
+                        year,
+                    )
+                    price_id += 1
+
+        copy_rows(
+            self.cursor,
+            "mini_bundle_price",
+            ["id", "mini_bundle_id", "price", "currency_id", "region_id", "year"],
+            prices(),
+        )
+
+    def load_retraction_summaries(self):
+        rng = self.random("retraction_summary")
+        first_id = next_id(self.cursor, "retraction_summary")
+
+        def rows():
+            summary_id = first_id
+            for journal in self.journals:
+                if rng.random() > 0.05:
+                    continue
+                for year in rng.sample(range(2005, 2022), rng.randint(1, 4)):
+                    retractions = rng.randint(1, 12)
+                    num_dois = rng.randint(retractions, 900)
+                    yield (
+                        summary_id,
+                        journal.issn_l,
+                        journal.issn_l,
+                        "Synthetic journal {}".format(journal.id),
+                        year,
+                        retractions,
+                        num_dois,
+                        RetractionSummary.calculate_percent_retracted(
+                            retractions, num_dois
+                        ),
+                    )
+                    summary_id += 1
+
+        copy_rows(
+            self.cursor,
+            "retraction_summary",
+            [
+                "id",
+                "issn",
+                "issn_l",
+                "journal",
+                "year",
+                "retractions",
+                "num_dois",
+                "percent_retracted",
+            ],
+            rows(),
+        )
+
+    def load_repositories(self):
+        rng = self.random("repositories")
+
+        def rows():
+            for journal in self.journals:
+                if rng.random() > 0.3:
+                    continue
+                for endpoint in rng.sample(range(REPOSITORY_COUNT), rng.randint(1, 5)):
+                    yield (
+                        journal.issn_l,
+                        "synthetic{:04d}".format(endpoint),
+                        "Repository {}".format(endpoint),
+                        "University {}".format(endpoint),
+                        "https://repository{}.example.org".format(endpoint),
+                        "https://repository{}.example.org/oai".format(endpoint),
+                        rng.randint(1, 400),
+                    )
+
+        copy_rows(
+            self.cursor,
+            "repositories",
+            [
+                "issn_l",
+                "endpoint_id",
+                "repository_name",
+                "institution_name",
+                "home_page",
+                "pmh_url",
+                "num_articles",
+            ],
+            rows(),
+        )
@@ -1,12 +1,13 @@
 import urllib.request
 
 import pandas as pd
-from sqlalchemy import MetaData
+from sqlalchemy import MetaData, tuple_
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.dialects import postgresql
 
 from app import db
 from models.journal import Journal
+from models.versions import queue_journal_versions
 
 
 class CSVImporter:
@@ -45,17 +46,30 @@ class CSVImporter:
         """
         Performs a Postgresql Upsert.
 
-        Will update all columns based on the provided primary keys.
+        Will update all columns based on the provided primary keys. Rows that did not
+        change are left alone, so only journals with new or changed rows get a new version.
         """
         table = self.metadata.tables.get(self.table)
         update_cols = [c.name for c in table.c if c not in self.primary_keys]
+        compared_cols = [
+            c
+            for c in update_cols
+            if c not in self.primary_keys + ["created_at", "updated_at"]
+        ]
         stmt = postgresql.insert(table).values(chunk)
 
         on_conflict_stmt = stmt.on_conflict_do_update(
             index_elements=self.primary_keys,
             set_={k: getattr(stmt.excluded, k) for k in update_cols},
+            where=tuple_(*[table.c[k] for k in compared_cols]).is_distinct_from(
+                tuple_(*[getattr(stmt.excluded, k) for k in compared_cols])
+            ),
         )
-        db.session.execute(on_conflict_stmt)
+        if "issn_l" in table.c:
+            changed = db.session.execute(on_conflict_stmt.returning(table.c.issn_l))
+            queue_journal_versions([row.issn_l for row in changed])
+        else:
+            db.session.execute(on_conflict_stmt)
         db.session.commit()
 
     def get_file(self):
@@ -73,6 +87,13 @@ def find_journal(issn):
     return Journal.find_by_issn(issn)
 
 
+def find_journals(issns):
+    """
+    Find journals for many ISSNs in one query. Returns a dict of issn -> journal.
+    """
+    return Journal.find_many_by_issn(list(set(issns)))
+
+
 def get_or_create(session, model, **kwargs):
     instance = session.query(model).filter_by(**kwargs).one_or_none()
     if instance:
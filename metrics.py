@@ -0,0 +1,110 @@
+import os
+import time
+
+import psutil
+from flask import g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from app import app, db
+
+# under gunicorn every worker writes its metrics to files in this directory, see
+# gunicorn.conf.py, and a scrape of any worker adds them all up
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+REQUEST_DURATION = Histogram(
+    "journalsdb_request_duration_seconds",
+    "Time spent handling requests, by endpoint.",
+    ["endpoint", "method", "status"],
+)
+RESPONSE_SIZE = Histogram(
+    "journalsdb_response_size_bytes",
+    "Size of response bodies as sent, after compression, by endpoint.",
+    ["endpoint"],
+    buckets=SIZE_BUCKETS,
+)
+RESPONSE_CACHE = Counter(
+    "journalsdb_response_cache_total",
+    "Responses of cached endpoints, by endpoint and hit or miss.",
+    ["endpoint", "result"],
+)
+POOL_CHECKED_OUT = Gauge(
+    "journalsdb_db_pool_checked_out",
+    "Database connections in use.",
+    multiprocess_mode="livesum",
+)
+POOL_OVERFLOW = Gauge(
+    "journalsdb_db_pool_overflow",
+    "Database connections open beyond the pool size.",
+    multiprocess_mode="livesum",
+)
+RESIDENT_MEMORY = Gauge(
+    "journalsdb_resident_memory_bytes",
+    "Resident memory of the API processes.",
+    multiprocess_mode="livesum",
+)
+
+process = psutil.Process()
+
+
+def update_process_metrics():
+    pool = db.engine.pool
+    # pools without a size, such as NullPool, have no checked out count
+    if hasattr(pool, "checkedout"):
+        POOL_CHECKED_OUT.set(pool.checkedout())
+        POOL_OVERFLOW.set(max(pool.overflow(), 0))
+    RESIDENT_MEMORY.set(process.memory_info().rss)
+
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_start = time.perf_counter()
+
+
+def record_request_metrics(response):
+    start = g.pop("metrics_start", None)
+    if start is None:
+        return response
+
+    endpoint = request.endpoint or "unmatched"
+    REQUEST_DURATION.labels(endpoint, request.method, response.status_code).observe(
+        time.perf_counter() - start
+    )
+    # streamed exports have no length up front
+    if response.content_length is not None:
+        RESPONSE_SIZE.labels(endpoint).observe(response.content_length)
+    if "X-Cache" in response.headers:
+        RESPONSE_CACHE.labels(endpoint, response.headers["X-Cache"].lower()).inc()
+    update_process_metrics()
+    return response
+
+
+# after_request functions run in reverse order, so this one runs last and sees the
+# response as sent, after compress_response
+app.after_request_funcs.setdefault(None, []).insert(0, record_request_metrics)
+
+
+@app.route("/metrics")
+def metrics():
+    """
+    Request, cache, database pool and memory metrics in the Prometheus text format.
+    """
+    update_process_metrics()
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return app.response_class(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST
+    )
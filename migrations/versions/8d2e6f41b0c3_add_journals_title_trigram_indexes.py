@@ -0,0 +1,44 @@
+"""add journals title trigram indexes
+
+Revision ID: 8d2e6f41b0c3
+Revises: c47e0b5d2a18
+Create Date: 2021-09-24 11:37:02.184559
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "8d2e6f41b0c3"
+down_revision = "c47e0b5d2a18"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+    # other titles are indexed as plain text, one per line, not as JSON
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION journal_other_titles(other_titles jsonb)
+        RETURNS text LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+            SELECT string_agg(value, E'\\n')
+            FROM jsonb_array_elements_text(
+                CASE WHEN jsonb_typeof(other_titles) = 'array' THEN other_titles END
+            )
+        $$;
+        """
+    )
+    op.execute(
+        "CREATE INDEX ix_journals_title_trgm ON journals USING gin (title gin_trgm_ops);"
+    )
+    op.execute(
+        "CREATE INDEX ix_journals_other_titles_trgm ON journals USING gin (journal_other_titles(other_titles) gin_trgm_ops);"
+    )
+
+
+def downgrade():
+    op.execute("DROP INDEX ix_journals_other_titles_trgm;")
+    op.execute("DROP INDEX ix_journals_title_trgm;")
+    op.execute("DROP FUNCTION journal_other_titles(jsonb);")
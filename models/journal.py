@@ -2,12 +2,13 @@ from datetime import datetime
 import enum
 import json
 
+from sqlalchemy import DDL, event
 from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 import shortuuid
 
 from app import db
-from models.issn import ISSNMetaData
+from models.issn import ISSNMetaData, ISSNToISSNL
 from models.mixins import TimestampMixin
 from models.subjects import journal_subjects
 from models.usage import DOICount
@@ -25,6 +26,26 @@ class JournalStatus(enum.Enum):
     UNKNOWN = "unknown"
 
 
+# plain text of the other_titles array, one title per line, so searches match titles
+# rather than JSON punctuation and escapes; immutable so an index can cover it
+OTHER_TITLES_TEXT_FUNCTION = """
+CREATE OR REPLACE FUNCTION journal_other_titles(other_titles jsonb) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT string_agg(value, E'\\n')
+    FROM jsonb_array_elements_text(
+        CASE WHEN jsonb_typeof(other_titles) = 'array' THEN other_titles END
+    )
+$$
+"""
+
+# create_all builds the trigram indexes of journals, which need the extension and the
+# other titles function
+event.listen(
+    db.Model.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+)
+event.listen(db.Model.metadata, "before_create", DDL(OTHER_TITLES_TEXT_FUNCTION))
+
+
 class Journal(db.Model):
     __tablename__ = "journals"
 
@@ -51,6 +72,23 @@ class Journal(db.Model):
     )
     updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # supports keyset (cursor) pagination on journals-paged
+        db.Index("ix_journals_created_at_id", created_at, id),
+        # substring and similarity title search
+        db.Index(
+            "ix_journals_title_trgm",
+            title,
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+        db.Index(
+            "ix_journals_other_titles_trgm",
+            text("journal_other_titles(other_titles) gin_trgm_ops"),
+            postgresql_using="gin",
+        ),
+    )
+
     # relationships
     apc_metadata = db.relationship(
         "APCMetadata", uselist=False, lazy=True, backref="journal"
@@ -71,6 +109,12 @@ class Journal(db.Model):
         uselist=False,
         viewonly=True,
     )
+    doi_counts_merged = db.relationship(
+        "DOICountMerged",
+        primaryjoin="Journal.issn_l == foreign(DOICountMerged.issn_l)",
+        uselist=False,
+        viewonly=True,
+    )
     imprint = db.relationship("Imprint")
     issn_metadata = db.relationship("ISSNMetaData")
     journal_metadata = db.relationship(
@@ -86,6 +130,12 @@ class Journal(db.Model):
     publisher = db.relationship(
         "Publisher", backref=db.backref("journals", lazy=True), lazy="joined"
     )
+    retraction_summaries = db.relationship(
+        "RetractionSummary",
+        primaryjoin="Journal.issn_l == foreign(RetractionSummary.issn_l)",
+        order_by="desc(RetractionSummary.year)",
+        viewonly=True,
+    )
     subjects = db.relationship("Subject", secondary=journal_subjects)
     subscription_prices = db.relationship(
         "SubscriptionPrice",
@@ -96,18 +146,43 @@ class Journal(db.Model):
 
     @classmethod
     def find_by_issn(cls, issn):
-        # try to find by issn_l
-        journal = cls.query.filter_by(issn_l=issn).one_or_none()
-        if journal:
-            return journal
+        """
+        Resolves an ISSN of any kind (ISSN-L, print, electronic or a merged ISSN-L)
+        with one indexed equality lookup on issn_to_issnl.
+        """
+        return (
+            cls.query.join(ISSNToISSNL, ISSNToISSNL.issn_l == cls.issn_l)
+            .filter(ISSNToISSNL.issn == issn)
+            .one_or_none()
+        )
 
-        # find in issn_org issns
-        metadata_record = ISSNMetaData.query.filter(
-            ISSNMetaData.issn_org_issns.contains(json.dumps(issn))
-        ).first()
+    @classmethod
+    def find_many_by_issn(cls, issns, options=None):
+        """
+        Resolves a list of ISSNs of any kind in one query against issn_to_issnl.
+        Returns a dict of issn -> journal for the ISSNs that matched a journal.
+        """
+        query = (
+            db.session.query(ISSNToISSNL.issn, cls)
+            .join(cls, cls.issn_l == ISSNToISSNL.issn_l)
+            .filter(ISSNToISSNL.issn.in_(issns))
+        )
+        if options:
+            query = query.options(*options)
+        return {issn: journal for issn, journal in query.all()}
 
-        if metadata_record:
-            return cls.query.filter_by(issn_l=metadata_record.issn_l).one_or_none()
+    @classmethod
+    def find_issn_ls(cls, issns):
+        """
+        Resolves a list of ISSNs of any kind to the issn_l of their journal in one
+        query, without loading journals. Returns a dict of issn -> issn_l.
+        """
+        query = (
+            db.session.query(ISSNToISSNL.issn, ISSNToISSNL.issn_l)
+            .join(cls, cls.issn_l == ISSNToISSNL.issn_l)
+            .filter(ISSNToISSNL.issn.in_(issns))
+        )
+        return dict(query.all())
 
     @classmethod
     def find_by_synonym(cls, synonym):
@@ -126,38 +201,14 @@ class Journal(db.Model):
     @property
     def total_dois(self):
         """Returns doi total for current and previous issn_ls combined."""
-        total = self.doi_counts.total_dois if self.doi_counts else None
-        if self.issn_metadata and self.issn_metadata.previous_issn_ls:
-            for issn in self.issn_metadata.previous_issn_ls:
-                doi_counts = DOICount.query.filter_by(issn_l=issn).one_or_none()
-                if doi_counts:
-                    if total:
-                        total = total + doi_counts.total_dois
-                    else:
-                        total = doi_counts.total_dois
-        return total
+        return self.doi_counts_merged.total_dois if self.doi_counts_merged else None
 
     @property
     def dois_by_year(self):
         """Returns sorted dois by year for current and former journals combined."""
-        dois_by_year = {}
-
-        if self.doi_counts:
-            # add current journal dois by year
-            dois_by_year.update(
-                {int(k): v for (k, v) in self.doi_counts.dois_by_year.items()}
-            )
-
-        if self.issn_metadata and self.issn_metadata.previous_issn_ls:
-            for issn in self.issn_metadata.previous_issn_ls:
-                doi_counts = DOICount.query.filter_by(issn_l=issn).one_or_none()
-                if doi_counts:
-                    # add former journal dois by year
-                    dois_by_year.update(
-                        {int(k): v for (k, v) in doi_counts.dois_by_year.items()}
-                    )
-        dois_combined_and_sorted = list(sorted(dois_by_year.items(), reverse=True))
-        return dois_combined_and_sorted
+        if self.doi_counts_merged:
+            return self.doi_counts_merged.dois_by_year_sorted
+        return []
 
     @property
     def apc_source(self):
@@ -167,6 +218,22 @@ class Journal(db.Model):
             return self.publisher.apc_data_source
 
 
+class JournalDocument(db.Model, TimestampMixin):
+    """
+    JournalDetailSchema and JournalListSchema output rendered by flask build_journal_documents.
+    Stored as text so the API can return it as is, with keys in schema order.
+    A document is only served while its version matches the journal version.
+    """
+
+    __tablename__ = "journal_documents"
+
+    issn_l = db.Column(db.String(9), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    detail_json = db.Column(db.Text, nullable=False)
+    list_json = db.Column(db.Text, nullable=False)
+    rendered_at = db.Column(db.DateTime, nullable=False)
+
+
 class JournalMetadata(db.Model, TimestampMixin):
     __tablename__ = "journal_metadata"
 
@@ -1,12 +1,10 @@
 import datetime
-import json
 
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy import UniqueConstraint
 
 from app import db
 from models.mixins import TimestampMixin
-from models.issn import ISSNMetaData
 
 
 class Citation(db.Model, TimestampMixin):
@@ -60,6 +58,25 @@ class DOICount(db.Model, TimestampMixin):
         )
 
 
+class DOICountMerged(db.Model):
+    """
+    DOI counts of a journal combined with the counts of its previous issn_ls. Built
+    with SQL by flask build_merged_doi_counts.
+    """
+
+    __tablename__ = "doi_counts_merged"
+
+    issn_l = db.Column(db.String(9), primary_key=True)
+    total_dois = db.Column(db.Integer, nullable=False)
+    dois_by_year = db.Column(JSONB, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+    @property
+    def dois_by_year_sorted(self):
+        dois = {int(k): v for (k, v) in self.dois_by_year.items()}
+        return list(sorted(dois.items(), reverse=True))
+
+
 class ExtensionRequests(db.Model, TimestampMixin):
     __tablename__ = "extension_requests"
 
@@ -121,6 +138,46 @@ class OpenAccess(db.Model, TimestampMixin):
 
         return dict_
 
+    @classmethod
+    def histories(cls, issn_ls):
+        """
+        Open access by year since 2010 of each journal, newest first, with the summary
+        summed in the same query. Returns a dict of issn_l -> (history, summary) for
+        the journals with open access data.
+        """
+        fields = sorted(
+            key
+            for key in cls.__mapper__.c.keys()
+            if key not in ["issn_l", "title", "created_at", "updated_at"]
+        )
+        totals = ["num_dois", "num_green", "num_hybrid"]
+        rows = (
+            db.session.query(
+                cls.issn_l,
+                *[getattr(cls, field) for field in fields],
+                *[
+                    db.func.coalesce(
+                        db.func.sum(getattr(cls, total)).over(partition_by=cls.issn_l),
+                        0,
+                    ).label("total_" + total)
+                    for total in totals
+                ],
+            )
+            .filter(cls.issn_l.in_(issn_ls))
+            .filter(cls.year > 2009)
+            .order_by(cls.issn_l, cls.year.desc())
+            .all()
+        )
+
+        histories = {}
+        for row in rows:
+            history, _ = histories.setdefault(
+                row.issn_l,
+                ([], {total: getattr(row, "total_" + total) for total in totals}),
+            )
+            history.append({field: getattr(row, field) for field in fields})
+        return histories
+
 
 class Repository(db.Model):
     __tablename__ = "repositories"
@@ -168,28 +225,47 @@ class RetractionSummary(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     issn = db.Column(db.String(9))
+    issn_l = db.Column(db.String(9))
     journal = db.Column(db.Text, nullable=False)
     year = db.Column(db.Integer, nullable=False)
     retractions = db.Column(db.Integer, nullable=False)
     num_dois = db.Column(db.Integer)
-    __table_args__ = (db.UniqueConstraint("issn", "year"),)
+    percent_retracted = db.Column(db.Float)
+    __table_args__ = (
+        db.UniqueConstraint("issn", "year"),
+        # retractions of a journal are read with one index range scan
+        db.Index("ix_retraction_summary_issn_l_year", issn_l, year),
+    )
 
-    @classmethod
-    def retractions_by_year(cls, issn_l):
-        retractions_by_year = []
-
-        retractions = cls.retractions_by_issn(issn_l)
-
-        if retractions:
-            for r in retractions:
-                percent_retracted = (r.retractions / r.num_dois) * 100
-                retractions_by_year.append(
-                    {
-                        "year": r.year,
-                        "retractions": r.retractions,
-                        "percent_retracted": float("{:.3}".format(percent_retracted)),
-                    }
-                )
+    @staticmethod
+    def calculate_percent_retracted(retractions, num_dois):
+        if not num_dois:
+            return None
+        return float("{:.3}".format((retractions / num_dois) * 100))
+
+    @staticmethod
+    def summarize(issn_l, retractions, issns=None):
+        """
+        Retractions by year from the summary rows of a journal. When retractions were
+        recorded under more than one issn of the journal, the rows of a single issn
+        are used: the issn_l, otherwise the first issn in the journal's issns order
+        (issn_org_issns), otherwise the lowest issn, such as one merged from a
+        previous issn_l.
+        """
+        order = [issn_l] + list(issns or [])
+        issns = sorted(
+            {r.issn for r in retractions},
+            key=lambda i: (order.index(i) if i in order else len(order), i),
+        )
+        retractions_by_year = [
+            {
+                "year": r.year,
+                "retractions": r.retractions,
+                "percent_retracted": r.percent_retracted,
+            }
+            for r in retractions
+            if r.issn == issns[0]
+        ]
 
         # provenance
         if len(retractions_by_year) > 0:
@@ -199,24 +275,3 @@ class RetractionSummary(db.Model):
             }
         else:
             return None
-
-    @classmethod
-    def retractions_by_issn(cls, issn_l):
-        """
-        Go through all available journal ISSNs to try and match it to retractions.
-        """
-        # try issn_l
-        retractions = cls.query.filter_by(issn=issn_l).all()
-        if retractions:
-            return retractions
-
-        # try other associated issns
-        metadata_record = ISSNMetaData.query.filter(
-            ISSNMetaData.issn_org_issns.contains(json.dumps(issn_l))
-        ).first()
-        if metadata_record:
-            for issn in metadata_record.issn_org_issns:
-                retractions = cls.query.filter_by(issn=issn).all()
-                if retractions:
-                    return retractions
-            return None
@@ -0,0 +1,305 @@
+import datetime
+
+from sqlalchemy import event, or_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from app import app, db
+from caching import CacheInvalidationError, invalidate_journals
+from models.author_permissions import AuthorPermissions
+from models.issn import ISSNMetaData, ISSNToISSNL
+from models.journal import Journal, JournalMetadata, Publisher
+from models.location import Country, Region
+from models.price import (
+    APCMetadata,
+    APCPrice,
+    Currency,
+    MiniBundle,
+    MiniBundlePrice,
+    SubscriptionPrice,
+    mini_bundle_journals,
+)
+from models.usage import (
+    Citation,
+    DOICount,
+    ExtensionRequests,
+    OpenAccess,
+    Repository,
+    RetractionSummary,
+)
+
+# models shown in the journal responses, by the column that links them to a journal
+ISSN_L_MODELS = (Journal, ISSNMetaData, DOICount, OpenAccess, Repository)
+JOURNAL_ID_MODELS = (
+    APCMetadata,
+    APCPrice,
+    AuthorPermissions,
+    Citation,
+    ExtensionRequests,
+    JournalMetadata,
+    SubscriptionPrice,
+)
+
+
+class JournalVersion(db.Model):
+    """
+    Version of everything shown for a journal, bumped whenever the journal or one of its
+    child rows changes. Used for ETag and Last-Modified headers.
+    """
+
+    __tablename__ = "journal_versions"
+
+    issn_l = db.Column(db.String(9), primary_key=True)
+    version = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+    @property
+    def etag(self):
+        return "{}-{}".format(self.issn_l, self.version)
+
+    @classmethod
+    def find_by_issn_l(cls, issn_l):
+        """
+        Version of a current journal. Versions of issn_ls that were merged away are
+        ignored, so those requests still reach the redirect.
+        """
+        return (
+            cls.query.join(Journal, Journal.issn_l == cls.issn_l)
+            .filter(cls.issn_l == issn_l)
+            .one_or_none()
+        )
+
+
+class JournalChange(db.Model):
+    """
+    Log of changed journals, one row for every version bump and for every deleted
+    journal, so at most one row per journal and transaction. Read by /journals/changes so mirrors can sync incrementally.
+    """
+
+    __tablename__ = "journal_changes"
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    issn_l = db.Column(db.String(9), nullable=False)
+    version = db.Column(db.Integer, nullable=True)
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+    changed_at = db.Column(db.DateTime, nullable=False, index=True)
+    # transaction that logged the change, the feed only reads finished transactions
+    txid = db.Column(
+        db.BigInteger, nullable=False, server_default=db.text("txid_current()")
+    )
+
+    __table_args__ = (
+        # the feed is read in (txid, id) order with one index range scan
+        db.Index("ix_journal_changes_txid_id", txid, id),
+    )
+
+
+def queue_journal_versions(issn_ls, session=None, deleted=False):
+    """
+    Marks journals as changed, or deleted, in the current transaction. Their versions
+    are bumped and their changes logged once when the transaction commits, however
+    often they are written before that.
+    Call after writing journal data with plain SQL, which the flush listener cannot see.
+    """
+    session = session or db.session
+    key = "deleted_issn_ls" if deleted else "pending_issn_ls"
+    session.info.setdefault(key, set()).update(i for i in issn_ls if i)
+
+
+def bump_journal_versions(issn_ls, session=None):
+    """
+    Increments the version of each journal, creating it at version 1, and logs the new
+    versions as journal changes. issn_ls without a journal are skipped.
+    """
+    issn_ls = sorted(set(i for i in issn_ls if i))
+    if not issn_ls:
+        return
+
+    session = session or db.session
+    # cached responses are invalidated once the transaction commits
+    session.info.setdefault("changed_issn_ls", set()).update(issn_ls)
+    table = JournalVersion.__table__
+    journals = db.select(
+        [
+            Journal.issn_l,
+            db.literal(1),
+            db.literal(datetime.datetime.utcnow(), type_=db.DateTime),
+        ]
+    ).where(Journal.issn_l.in_(issn_ls))
+    stmt = postgresql.insert(table).from_select(
+        ["issn_l", "version", "updated_at"], journals
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["issn_l"],
+        set_={"version": table.c.version + 1, "updated_at": stmt.excluded.updated_at},
+    ).returning(table.c.issn_l, table.c.version, table.c.updated_at)
+    log_journal_changes(
+        [
+            {
+                "issn_l": row.issn_l,
+                "version": row.version,
+                "deleted": False,
+                "changed_at": row.updated_at,
+            }
+            for row in session.execute(stmt)
+        ],
+        session,
+    )
+
+
+def log_deleted_journals(issn_ls, session=None):
+    """
+    Logs journal changes for deleted journals, which have no version to bump. issn_ls
+    that still have a journal, such as one moved to another row, are skipped.
+    """
+    session = session or db.session
+    existing = set(
+        row.issn_l
+        for row in session.query(Journal.issn_l).filter(Journal.issn_l.in_(issn_ls))
+    )
+    changed_at = datetime.datetime.utcnow()
+    log_journal_changes(
+        [
+            {
+                "issn_l": issn_l,
+                "version": None,
+                "deleted": True,
+                "changed_at": changed_at,
+            }
+            for issn_l in sorted(set(issn_ls) - existing)
+        ],
+        session,
+    )
+
+
+def log_journal_changes(changes, session):
+    if changes:
+        session.execute(JournalChange.__table__.insert(), changes)
+
+
+@event.listens_for(Session, "after_flush")
+def queue_flushed_journal_versions(session, flush_context):
+    """
+    Queues the journals with rows that were added, changed or deleted in the flush.
+    Foreign keys are populated at this point, even when set through relationships.
+    """
+    issn_ls = set()
+    journal_ids = set()
+    publisher_ids = set()
+    mini_bundle_ids = set()
+    issns = set()
+    # lookup rows shown with every price that refers to them
+    price_lookups = {"currency_id": set(), "country_id": set(), "region_id": set()}
+
+    changed = [o for o in session.dirty if session.is_modified(o)]
+    for obj in list(session.new) + changed + list(session.deleted):
+        if isinstance(obj, ISSN_L_MODELS):
+            issn_ls.add(obj.issn_l)
+        elif isinstance(obj, JOURNAL_ID_MODELS):
+            journal_ids.add(obj.journal_id)
+        elif isinstance(obj, Publisher):
+            publisher_ids.add(obj.id)
+        elif isinstance(obj, MiniBundle):
+            mini_bundle_ids.add(obj.id)
+        elif isinstance(obj, MiniBundlePrice):
+            mini_bundle_ids.add(obj.mini_bundle_id)
+        elif isinstance(obj, Currency):
+            price_lookups["currency_id"].add(obj.id)
+        elif isinstance(obj, Country):
+            price_lookups["country_id"].add(obj.id)
+        elif isinstance(obj, Region):
+            price_lookups["region_id"].add(obj.id)
+        elif isinstance(obj, RetractionSummary):
+            if obj.issn_l:
+                issn_ls.add(obj.issn_l)
+            else:
+                issns.add(obj.issn)
+
+    deleted_issn_ls = set(o.issn_l for o in session.deleted if isinstance(o, Journal))
+
+    journal_ids.discard(None)
+    publisher_ids.discard(None)
+    mini_bundle_ids.discard(None)
+    issns.discard(None)
+
+    filters = []
+    if journal_ids:
+        filters.append(Journal.id.in_(journal_ids))
+    if publisher_ids:
+        filters.append(Journal.publisher_id.in_(publisher_ids))
+    for column, ids in price_lookups.items():
+        ids.discard(None)
+        if not ids:
+            continue
+        for price in (SubscriptionPrice, APCPrice):
+            filters.append(
+                Journal.id.in_(
+                    db.select([price.journal_id]).where(getattr(price, column).in_(ids))
+                )
+            )
+        mini_bundle_ids.update(
+            row.mini_bundle_id
+            for row in session.query(MiniBundlePrice.mini_bundle_id).filter(
+                getattr(MiniBundlePrice, column).in_(ids)
+            )
+        )
+    if mini_bundle_ids:
+        filters.append(
+            Journal.id.in_(
+                db.select([mini_bundle_journals.c.journal_id]).where(
+                    mini_bundle_journals.c.mini_bundle_id.in_(mini_bundle_ids)
+                )
+            )
+        )
+    if filters:
+        issn_ls.update(
+            row.issn_l
+            for row in session.query(Journal.issn_l).filter(or_(*filters)).all()
+        )
+    if issns:
+        issn_ls.update(
+            row.issn_l
+            for row in session.query(ISSNToISSNL.issn_l)
+            .filter(ISSNToISSNL.issn.in_(issns))
+            .all()
+        )
+
+    queue_journal_versions(issn_ls, session)
+    queue_journal_versions(deleted_issn_ls, session, deleted=True)
+
+
+@event.listens_for(Session, "before_commit")
+def bump_queued_journal_versions(session):
+    """
+    Bumps the versions of the journals queued in the transaction, once per journal,
+    so ingests that flush every row log a single change.
+    """
+    if session.transaction.nested:
+        # savepoints are released into the transaction that is still running
+        return
+    # commit flushes after this hook, changes still pending would be missed
+    session.flush()
+    issn_ls = session.info.pop("pending_issn_ls", None)
+    deleted_issn_ls = session.info.pop("deleted_issn_ls", None)
+    if issn_ls:
+        bump_journal_versions(issn_ls, session)
+    if deleted_issn_ls:
+        log_deleted_journals(deleted_issn_ls, session)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_committed_journals(session):
+    issn_ls = session.info.pop("changed_issn_ls", None)
+    if issn_ls:
+        try:
+            invalidate_journals(issn_ls)
+        except CacheInvalidationError:
+            # raising would leave the session unusable, the invalidation stays
+            # pending and flask commands fail when they finish, see commands.py
+            app.logger.exception("changed journals were not invalidated")
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_rolled_back_journals(session):
+    for key in ["pending_issn_ls", "deleted_issn_ls", "changed_issn_ls"]:
+        session.info.pop(key, None)
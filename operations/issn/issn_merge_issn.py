@@ -1,4 +1,6 @@
 from app import db
+from ingest.doi_counts import refresh_merged_doi_counts
+from ingest.retraction_watch import remap_retraction_summaries
 from models.issn import ISSNMetaData, ISSNToISSNL
 from models.journal import Journal
 from models.usage import DOICount, OpenAccess
@@ -20,6 +22,8 @@ class MergeIssn:
         self.map_issns_to_new_issn_l()
         self.add_issn_to_new_issn_org_issns()
         self.set_other_title()
+        self.refresh_merged_doi_counts()
+        self.remap_retraction_summaries()
 
     def delete_old_journal(self):
         j = db.session.query(Journal).filter_by(issn_l=self.issn_from).one()
@@ -107,3 +111,13 @@ class MergeIssn:
                 self.old_title, j.title
             )
         )
+
+    def refresh_merged_doi_counts(self):
+        refresh_merged_doi_counts([self.issn_from, self.issn_to])
+        db.session.commit()
+        print("merged doi counts for issn {} refreshed".format(self.issn_to))
+
+    def remap_retraction_summaries(self):
+        remap_retraction_summaries([self.issn_from, self.issn_to])
+        db.session.commit()
+        print("retraction summaries for issn {} remapped".format(self.issn_to))
@@ -1,4 +1,5 @@
 from app import db
+from ingest.retraction_watch import remap_retraction_summaries
 from models.issn import ISSNMetaData, ISSNToISSNL
 from models.journal import Journal
 
@@ -7,13 +8,20 @@ class MoveIssn:
     def __init__(self, issn_from, issn_to):
         self.issn_from = issn_from
         self.issn_to = issn_to
+        self.old_issn_l = None
 
     def move_issn(self):
+        # the issn may be mapped to an issn_l other than itself
+        old_mapping = (
+            db.session.query(ISSNToISSNL).filter_by(issn=self.issn_from).first()
+        )
+        self.old_issn_l = old_mapping.issn_l if old_mapping else self.issn_from
         self.delete_old_journal()
         self.delete_old_issn_metadata()
         self.delete_old_issn_to_issnl()
         self.map_issn_to_new_issn_l()
         self.add_issn_to__new_issn_org_issns()
+        self.remap_retraction_summaries()
 
     def delete_old_journal(self):
         j = db.session.query(Journal).filter_by(issn_l=self.issn_from).one_or_none()
@@ -89,3 +97,8 @@ class MoveIssn:
                 self.issn_from, self.issn_to
             )
         )
+
+    def remap_retraction_summaries(self):
+        remap_retraction_summaries([self.issn_from, self.old_issn_l, self.issn_to])
+        db.session.commit()
+        print("retraction summaries for issn {} remapped".format(self.issn_from))
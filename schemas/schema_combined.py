@@ -122,7 +122,9 @@ class JournalDetailSchema(JournalListSchema):
     )
     permissions = fields.Nested(AuthorPermissionsSchema, data_key="author_permissions")
     retractions = fields.Function(
-        lambda obj: RetractionSummary.retractions_by_year(obj.issn_l)
+        lambda obj: RetractionSummary.summarize(
+            obj.issn_l, obj.retraction_summaries, obj.issns
+        )
     )
 
     class Meta:
@@ -2,7 +2,7 @@ import os
 
 import pytest
 
-from app import db
+from app import cache, db
 from tests.factories import import_api_test_data
 from ingest.journals.journals_commands import process_new_journals
 from ingest.issn.issn_import_issns import import_issns
@@ -86,3 +86,14 @@ def run_import_issns_with_api():
         runner.invoke(process_new_journals)
 
     return _import
+
+
+@pytest.fixture
+def response_cache():
+    """
+    Swaps the NullCache used in testing for an in-memory cache.
+    """
+    cache.init_app(app, config={"CACHE_TYPE": "SimpleCache"})
+    cache.clear()
+    yield cache
+    cache.init_app(app, config={"CACHE_TYPE": "NullCache"})
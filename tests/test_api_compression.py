@@ -0,0 +1,110 @@
+import gzip
+import zlib
+
+import pytest
+
+import compression
+
+
+class TestAPICompression:
+    def test_gzip(self, api_client):
+        plain = api_client.get("/journals").get_data()
+        rv = api_client.get("/journals", headers={"Accept-Encoding": "gzip"})
+        assert rv.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in rv.headers["Vary"]
+        assert len(rv.get_data()) < len(plain)
+        assert gzip.decompress(rv.get_data()) == plain
+
+    def test_brotli_preferred(self, api_client):
+        brotli = pytest.importorskip("brotli")
+        plain = api_client.get("/journals").get_data()
+        rv = api_client.get("/journals", headers={"Accept-Encoding": "gzip, br"})
+        assert rv.headers["Content-Encoding"] == "br"
+        assert brotli.decompress(rv.get_data()) == plain
+
+    def test_not_accepted(self, api_client):
+        rv = api_client.get("/journals", headers={"Accept-Encoding": "identity"})
+        assert "Content-Encoding" not in rv.headers
+        assert "Accept-Encoding" in rv.headers["Vary"]
+
+    def test_small_responses_not_compressed(self, api_client):
+        rv = api_client.get(
+            "/journals/search?query=nothing", headers={"Accept-Encoding": "gzip"}
+        )
+        assert "Content-Encoding" not in rv.headers
+
+    def test_streamed_export(self, api_client):
+        plain = api_client.get("/journals.jsonl").get_data()
+        rv = api_client.get("/journals.jsonl", headers={"Accept-Encoding": "gzip"})
+        assert rv.headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(rv.get_data()) == plain
+
+    def test_compressed_etag_is_weak(self, api_client):
+        rv = api_client.get("/journals/2291-5222", headers={"Accept-Encoding": "gzip"})
+        assert rv.headers["ETag"].startswith("W/")
+        rv = api_client.get(
+            "/journals/2291-5222",
+            headers={"Accept-Encoding": "gzip", "If-None-Match": rv.headers["ETag"]},
+        )
+        assert rv.status_code == 304
+
+    def test_cache_hits_are_not_compressed_again(
+        self, api_client, response_cache, monkeypatch
+    ):
+        rv = api_client.get("/journals", headers={"Accept-Encoding": "gzip"})
+        assert rv.headers["X-Cache"] == "MISS"
+        compressed = rv.get_data()
+
+        def compress(body, encoding):
+            raise AssertionError("compressed again")
+
+        monkeypatch.setattr(compression, "compress", compress)
+        rv = api_client.get("/journals", headers={"Accept-Encoding": "gzip"})
+        assert rv.headers["X-Cache"] == "HIT"
+        assert rv.headers["Content-Encoding"] == "gzip"
+        assert rv.get_data() == compressed
+
+    def test_cache_miss_compresses_negotiated_encoding(
+        self, api_client, response_cache, monkeypatch
+    ):
+        pytest.importorskip("brotli")
+        encodings = []
+        compress = compression.compress
+
+        def record(body, encoding):
+            encodings.append(encoding)
+            return compress(body, encoding)
+
+        monkeypatch.setattr(compression, "compress", record)
+        api_client.get("/journals", headers={"Accept-Encoding": "gzip"})
+        assert encodings == ["gzip"]
+        rv = api_client.get("/journals", headers={"Accept-Encoding": "br"})
+        assert rv.headers["X-Cache"] == "HIT"
+        assert rv.headers["Content-Encoding"] == "br"
+        api_client.get("/journals", headers={"Accept-Encoding": "br"})
+        api_client.get("/journals", headers={"Accept-Encoding": "gzip"})
+        assert encodings == ["gzip", "br"]
+
+    def test_not_compressed_when_not_accepted(self, api_client, monkeypatch):
+        def compress(body, encoding):
+            raise AssertionError("compressed")
+
+        monkeypatch.setattr(compression, "compress", compress)
+        rv = api_client.get("/journals", headers={"Accept-Encoding": "identity"})
+        assert rv.status_code == 200
+
+    def test_streamed_chunks_are_flushed(self):
+        chunks = [b'{"issn_l": "2291-5222"}\n', b'{"issn_l": "1354-7798"}\n']
+        compressed = list(compression.compress_stream(iter(chunks), "gzip"))
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        # each chunk can be decompressed before the stream ends
+        assert decompressor.decompress(compressed[0]) == chunks[0]
+        assert decompressor.decompress(compressed[1]) == chunks[1]
+
+    def test_streamed_brotli_chunks_are_flushed(self):
+        brotli = pytest.importorskip("brotli")
+        chunks = [b'{"issn_l": "2291-5222"}\n', b'{"issn_l": "1354-7798"}\n']
+        compressed = list(compression.compress_stream(iter(chunks), "br"))
+        decompressor = brotli.Decompressor()
+        assert decompressor.process(compressed[0]) == chunks[0]
+        assert decompressor.process(compressed[1]) == chunks[1]
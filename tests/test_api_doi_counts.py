@@ -0,0 +1,49 @@
+from app import db
+from ingest.doi_counts import refresh_merged_doi_counts
+from models.usage import DOICount, DOICountMerged
+from models.versions import JournalVersion
+
+
+class TestAPIDOICountsMerged:
+    def test_merged_with_previous_issn_l(self, api_client):
+        merged = DOICountMerged.query.get("2291-5222")
+        assert merged.total_dois == 4
+        assert merged.dois_by_year_sorted == [(2021, 2), (2020, 2)]
+
+    def test_unchanged_counts_are_not_rewritten(self, api_client):
+        assert refresh_merged_doi_counts() == []
+
+    def test_refresh_after_doi_import(self, api_client):
+        version = JournalVersion.query.get("2291-5222").version
+        previous = DOICount.query.get("6622-5522")
+        previous.dois_by_year = {"2021": 2, "2020": 5}
+        db.session.commit()
+
+        assert refresh_merged_doi_counts(["2291-5222"]) == ["2291-5222"]
+        db.session.commit()
+        assert JournalVersion.query.get("2291-5222").version > version
+
+        rv = api_client.get("/journals/2291-5222")
+        json_data = rv.get_json()
+        # every count is added up, the previous issn_l wins a year both have
+        assert json_data["total_dois"] == 9
+        assert json_data["dois_by_issued_year"] == [[2021, 2], [2020, 5]]
+
+        previous.dois_by_year = {"2021": 2}
+        db.session.commit()
+        refresh_merged_doi_counts(["2291-5222"])
+        db.session.commit()
+
+    def test_removed_counts(self, api_client):
+        db.session.add(DOICount(issn_l="1907-1760", dois_by_year={"2019": 3}))
+        db.session.commit()
+        refresh_merged_doi_counts()
+        assert DOICountMerged.query.get("1907-1760").total_dois == 3
+
+        DOICount.query.filter_by(issn_l="1907-1760").delete()
+        assert refresh_merged_doi_counts() == ["1907-1760"]
+        db.session.commit()
+        assert DOICountMerged.query.get("1907-1760") is None
+        rv = api_client.get("/journals/1907-1760")
+        assert rv.get_json()["total_dois"] is None
+        assert rv.get_json()["dois_by_issued_year"] == []
@@ -0,0 +1,151 @@
+from app import app, db
+from ingest.journal_changes import prune_journal_changes
+from models.issn import ISSNMetaData
+from models.journal import Journal
+from models.price import SubscriptionPrice
+from models.versions import JournalChange, JournalVersion, queue_journal_versions
+
+
+def sync(api_client, **params):
+    """
+    Follows the change feed until it has no more changes, returns the results and the
+    cursor to resume from.
+    """
+    results = []
+    while True:
+        rv = api_client.get("/journals/changes", query_string=params)
+        assert rv.status_code == 200
+        json_data = rv.get_json()
+        results += json_data["results"]
+        params = {"cursor": json_data["pagination"]["next_cursor"]}
+        if not json_data["pagination"]["has_more"]:
+            return results, params["cursor"]
+
+
+class TestAPIJournalChanges:
+    def test_changes_since(self, api_client):
+        results, cursor = sync(api_client, since="2000-01-01T00:00:00Z")
+        issn_ls = [result["issn_l"] for result in results]
+        assert len(issn_ls) == len(set(issn_ls)) == 4
+        assert "2291-5222" in issn_ls
+        assert cursor
+
+    def test_since_in_the_future(self, api_client):
+        rv = api_client.get("/journals/changes?since=2999-01-01T00:00:00")
+        json_data = rv.get_json()
+        assert json_data["results"] == []
+        assert json_data["pagination"]["next_cursor"]
+
+    def test_changed_price_is_listed(self, api_client):
+        _, cursor = sync(api_client)
+        price = SubscriptionPrice.query.first()
+        issn_l = Journal.query.get(price.journal_id).issn_l
+        price.price = price.price + 1
+        db.session.commit()
+
+        results, next_cursor = sync(api_client, cursor=cursor)
+        assert [result["issn_l"] for result in results] == [issn_l]
+        assert results[0]["version"] == JournalVersion.query.get(issn_l).version
+        assert results[0]["deleted"] is False
+        assert next_cursor != cursor
+        assert sync(api_client, cursor=next_cursor)[0] == []
+
+    def test_changes_are_listed_once_per_page(self, api_client):
+        _, cursor = sync(api_client)
+        journal = Journal.query.filter_by(issn_l="1354-7798").one()
+        for title in ["European financial management", "European finance"]:
+            journal.title = title
+            db.session.commit()
+
+        results, _ = sync(api_client, cursor=cursor)
+        assert len(results) == 1
+        assert results[0]["version"] == JournalVersion.query.get("1354-7798").version
+
+    def test_one_change_per_transaction(self, api_client):
+        changes = JournalChange.query.filter_by(issn_l="1354-7798").count()
+        journal = Journal.query.filter_by(issn_l="1354-7798").one()
+        journal.title = "European finance review"
+        db.session.flush()
+        journal.title = "European finance journal"
+        db.session.flush()
+        # and written with plain SQL in the same transaction
+        queue_journal_versions(["1354-7798"])
+        db.session.commit()
+
+        assert JournalChange.query.filter_by(issn_l="1354-7798").count() == changes + 1
+
+    def test_per_page(self, api_client):
+        rv = api_client.get("/journals/changes?per-page=1")
+        json_data = rv.get_json()
+        assert len(json_data["results"]) == 1
+        assert json_data["pagination"]["has_more"] is True
+
+        results, _ = sync(api_client, **{"per-page": 1})
+        assert len(set(result["issn_l"] for result in results)) == 4
+
+    def test_documents(self, api_client):
+        results, _ = sync(api_client, documents="true")
+        journals = {result["issn_l"]: result["journal"] for result in results}
+        assert journals["2291-5222"]["title"] == "JMIR mhealth and uhealth"
+        assert journals["2291-5222"]["issn_l"] == "2291-5222"
+
+    def test_uncommitted_changes_are_not_skipped(self, api_client):
+        _, cursor = sync(api_client)
+        # a slow ingest logs a change and commits after a later change was read
+        connection = db.engine.connect()
+        transaction = connection.begin()
+        connection.execute(
+            JournalChange.__table__.insert(),
+            {
+                "issn_l": "2291-5222",
+                "version": 100,
+                "deleted": False,
+                "changed_at": "2021-10-01",
+            },
+        )
+        journal = Journal.query.filter_by(issn_l="1354-7798").one()
+        journal.title = "European financial management"
+        db.session.commit()
+
+        results, next_cursor = sync(api_client, cursor=cursor)
+        assert results == []
+        assert next_cursor == cursor
+
+        transaction.commit()
+        connection.close()
+        results, _ = sync(api_client, cursor=cursor)
+        assert [result["issn_l"] for result in results] == ["2291-5222", "1354-7798"]
+
+    def test_deleted_journal(self, api_client):
+        db.session.add(ISSNMetaData(issn_l="0000-0019"))
+        journal = Journal(id=99, issn_l="0000-0019", title="Deleted journal")
+        db.session.add(journal)
+        db.session.commit()
+        _, cursor = sync(api_client)
+
+        db.session.delete(journal)
+        db.session.commit()
+        results, _ = sync(api_client, cursor=cursor, documents="true")
+        assert results == [
+            {
+                "issn_l": "0000-0019",
+                "version": None,
+                "deleted": True,
+                "changed_at": results[0]["changed_at"],
+                "journal": None,
+            }
+        ]
+
+    def test_invalid_parameters(self, api_client):
+        rv = api_client.get("/journals/changes?cursor=invalid")
+        assert rv.status_code == 403
+        rv = api_client.get("/journals/changes?since=yesterday")
+        assert rv.status_code == 403
+        rv = api_client.get("/journals/changes?per-page=1001")
+        assert rv.status_code == 403
+
+    def test_prune_journal_changes(self, api_client):
+        runner = app.test_cli_runner()
+        result = runner.invoke(prune_journal_changes, ["--days", "0"])
+        assert result.exit_code == 0
+        assert JournalChange.query.count() == 0
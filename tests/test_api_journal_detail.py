@@ -1,5 +1,7 @@
 from flask import request, url_for
 
+from models.usage import RetractionSummary
+
 
 class TestAPIJournalDetail:
     """Journal detail: /journals/<issn>."""
@@ -12,6 +14,10 @@ class TestAPIJournalDetail:
         api_client.get("/journals/2460-6626", follow_redirects=True)
         assert request.path == url_for("journal_detail", issn="1907-1760")
 
+    def test_redirected_previous_issn_l(self, api_client):
+        api_client.get("/journals/6622-5522", follow_redirects=True)
+        assert request.path == url_for("journal_detail", issn="2291-5222")
+
     def test_journal_detail(self, api_client):
         rv = api_client.get("/journals/2291-5222")
         assert rv.status_code == 200
@@ -70,3 +76,36 @@ class TestAPIJournalDetail:
         json_data = rv.get_json()
         assert json_data["total_dois"] == 4
         assert json_data["dois_by_issued_year"] == [[2021, 2], [2020, 2]]
+
+    def test_journal_retractions(self, api_client):
+        rv = api_client.get("/journals/2291-5222")
+        json_data = rv.get_json()
+        assert json_data["retractions"] == {
+            "provenance": "https://retractionwatch.com/",
+            "retractions_by_year": [
+                {"year": 1990, "retractions": 4, "percent_retracted": 133.0}
+            ],
+        }
+
+    def test_journal_retractions_under_several_issns(self, api_client):
+        retractions = [
+            RetractionSummary(issn="2460-6626", year=2019, retractions=1),
+            RetractionSummary(issn="1907-1760", year=2019, retractions=2),
+            RetractionSummary(issn="1907-1760", year=2018, retractions=3),
+        ]
+        summary = RetractionSummary.summarize("1907-1760", retractions)
+        assert [r["retractions"] for r in summary["retractions_by_year"]] == [2, 3]
+        assert RetractionSummary.summarize("1907-1760", []) is None
+
+    def test_journal_retractions_follow_issn_order(self, api_client):
+        retractions = [
+            RetractionSummary(issn="1111-1111", year=2019, retractions=1),
+            RetractionSummary(issn="2460-6626", year=2019, retractions=2),
+        ]
+        summary = RetractionSummary.summarize(
+            "1907-1760", retractions, ["1907-1760", "2460-6626", "1111-1111"]
+        )
+        assert [r["retractions"] for r in summary["retractions_by_year"]] == [2]
+        # issns the journal does not list come last, lowest first
+        summary = RetractionSummary.summarize("1907-1760", retractions, ["1907-1760"])
+        assert [r["retractions"] for r in summary["retractions_by_year"]] == [1]
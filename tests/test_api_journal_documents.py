@@ -0,0 +1,50 @@
+from app import db
+from ingest.journal_documents import build_journal_documents
+from models.journal import Journal, JournalDocument
+from models.versions import JournalVersion
+from tests.conftest import NUMBER_OF_JOURNALS
+from views import app
+
+
+def run_build_journal_documents(*args):
+    runner = app.test_cli_runner()
+    runner.invoke(build_journal_documents, ["--base_url", "http://localhost", *args])
+
+
+class TestAPIJournalDocuments:
+    """Pre-rendered journal documents built with flask build_journal_documents."""
+
+    def test_documents_match_rendered_responses(self, api_client):
+        detail = api_client.get("/journals/2291-5222").get_json()
+        paged = api_client.get("/journals-paged").get_json()
+
+        run_build_journal_documents()
+
+        assert JournalDocument.query.count() == NUMBER_OF_JOURNALS
+        assert api_client.get("/journals/2291-5222").get_json() == detail
+        assert api_client.get("/journals-paged").get_json() == paged
+
+    def test_stale_documents_are_not_served(self, api_client):
+        run_build_journal_documents()
+        journal = Journal.query.filter_by(issn_l="1354-7798").one()
+        journal.title = "European financial management review"
+        db.session.commit()
+
+        rv = api_client.get("/journals/1354-7798")
+        assert rv.get_json()["title"] == "European financial management review"
+
+        run_build_journal_documents()
+        document = JournalDocument.query.get("1354-7798")
+        assert document.version == JournalVersion.query.get("1354-7798").version
+        assert "European financial management review" in document.detail_json
+
+    def test_documents_redirect_secondary_issn(self, api_client):
+        run_build_journal_documents()
+        rv = api_client.get("/journals/2460-6626")
+        assert rv.status_code == 302
+
+    def test_documents_not_used_with_attrs(self, api_client):
+        run_build_journal_documents()
+        rv = api_client.get("/journals-paged?attrs=issn_l,title")
+        sample = rv.get_json()["results"][0]
+        assert list(sample.keys()) == ["issn_l", "title"]
@@ -14,3 +14,30 @@ class TestAPIJournalSearch:
         json_data = rv.get_json()
         assert rv.status_code == 200
         assert json_data == "no results found"
+
+    def test_search_partial_title(self, api_client):
+        rv = api_client.get("/journals/search?query=financial")
+        json_data = rv.get_json()
+        assert [item["issn_l"] for item in json_data] == ["1354-7798"]
+        assert rv.headers["X-Total-Count"] == "1"
+
+    def test_search_other_titles(self, api_client):
+        rv = api_client.get("/journals/search?query=living yesterday")
+        json_data = rv.get_json()
+        assert [item["issn_l"] for item in json_data] == ["5577-4444"]
+
+    def test_search_other_titles_ignores_json(self, api_client):
+        # other_titles is stored as ["Living Yesterday"]
+        for query in ['"', '", "', "[", "\\u"]:
+            rv = api_client.get("/journals/search", query_string={"query": query})
+            assert rv.get_json() == []
+
+    def test_search_ranked_by_similarity(self, api_client):
+        rv = api_client.get("/journals/search?query=living today")
+        json_data = rv.get_json()
+        assert json_data[0]["journal_title"] == "Living Today"
+
+    def test_search_no_matches(self, api_client):
+        rv = api_client.get("/journals/search?query=zzzzzz")
+        assert rv.get_json() == []
+        assert rv.headers["X-Total-Count"] == "0"
@@ -0,0 +1,113 @@
+from app import db
+from models.journal import Journal
+from models.price import Currency, SubscriptionPrice
+from models.versions import JournalVersion
+
+
+class TestAPIJournalVersions:
+    """Conditional requests with ETag and Last-Modified headers."""
+
+    def test_version_headers(self, api_client):
+        rv = api_client.get("/journals/2291-5222")
+        version = JournalVersion.query.get("2291-5222")
+        assert rv.headers["ETag"] == '"{}"'.format(version.etag)
+        assert "Last-Modified" in rv.headers
+
+    def test_if_none_match(self, api_client):
+        rv = api_client.get("/journals/2291-5222")
+        rv = api_client.get(
+            "/journals/2291-5222", headers={"If-None-Match": rv.headers["ETag"]}
+        )
+        assert rv.status_code == 304
+        assert rv.data == b""
+
+    def test_if_modified_since(self, api_client):
+        rv = api_client.get("/journals/2291-5222")
+        rv = api_client.get(
+            "/journals/2291-5222",
+            headers={"If-Modified-Since": rv.headers["Last-Modified"]},
+        )
+        assert rv.status_code == 304
+
+    def test_changed_journal_has_new_etag(self, api_client):
+        etag = api_client.get("/journals/1354-7798").headers["ETag"]
+        journal = Journal.query.filter_by(issn_l="1354-7798").one()
+        journal.title = "European financial management review"
+        db.session.commit()
+
+        rv = api_client.get("/journals/1354-7798", headers={"If-None-Match": etag})
+        assert rv.status_code == 200
+        assert rv.headers["ETag"] != etag
+
+    def test_changed_price_has_new_etag(self, api_client):
+        price = SubscriptionPrice.query.first()
+        issn_l = Journal.query.get(price.journal_id).issn_l
+        etag = api_client.get("/journals/{}".format(issn_l)).headers["ETag"]
+        price.price = price.price + 1
+        db.session.commit()
+
+        rv = api_client.get(
+            "/journals/{}".format(issn_l), headers={"If-None-Match": etag}
+        )
+        assert rv.status_code == 200
+
+    def test_changed_currency_has_new_etag(self, api_client):
+        price = SubscriptionPrice.query.first()
+        issn_l = Journal.query.get(price.journal_id).issn_l
+        etag = api_client.get("/journals/{}".format(issn_l)).headers["ETag"]
+        currency = Currency.query.get(price.currency_id)
+        currency.text = currency.text + " (changed)"
+        db.session.commit()
+
+        rv = api_client.get(
+            "/journals/{}".format(issn_l), headers={"If-None-Match": etag}
+        )
+        assert rv.status_code == 200
+        assert rv.headers["ETag"] != etag
+
+    def test_changed_region_has_new_etag(self, api_client):
+        price = SubscriptionPrice.query.filter(
+            SubscriptionPrice.region_id.isnot(None)
+        ).first()
+        issn_l = Journal.query.get(price.journal_id).issn_l
+        etag = api_client.get("/journals/{}".format(issn_l)).headers["ETag"]
+        price.region.name = price.region.name + " (changed)"
+        db.session.commit()
+
+        rv = api_client.get(
+            "/journals/{}".format(issn_l), headers={"If-None-Match": etag}
+        )
+        assert rv.status_code == 200
+        assert rv.headers["ETag"] != etag
+
+    def test_open_access_if_none_match(self, api_client):
+        rv = api_client.get("/journals/2291-5222/open-access")
+        rv = api_client.get(
+            "/journals/2291-5222/open-access",
+            headers={"If-None-Match": rv.headers["ETag"]},
+        )
+        assert rv.status_code == 304
+
+    def test_repositories_if_none_match(self, api_client):
+        rv = api_client.get("/journals/2291-5222/repositories")
+        rv = api_client.get(
+            "/journals/2291-5222/repositories",
+            headers={"If-None-Match": rv.headers["ETag"]},
+        )
+        assert rv.status_code == 304
+
+    def test_redirected_issn_has_no_version(self, api_client):
+        rv = api_client.get("/journals/2460-6626")
+        assert rv.status_code == 302
+        assert "ETag" not in rv.headers
+
+    def test_one_version_per_transaction(self, api_client):
+        version = JournalVersion.query.get("1354-7798").version
+        journal = Journal.query.filter_by(issn_l="1354-7798").one()
+        journal.title = "European finance review"
+        db.session.flush()
+        journal.title = "European finance journal"
+        db.session.flush()
+        db.session.commit()
+
+        assert JournalVersion.query.get("1354-7798").version == version + 1
@@ -0,0 +1,67 @@
+from app import db
+from models.issn import ISSNToISSNL
+
+
+class TestAPIJournalsBatch:
+    """Batch journal lookup: POST /journals/batch"""
+
+    def test_batch_lookup(self, api_client):
+        rv = api_client.post(
+            "/journals/batch", json={"issns": ["2291-5222", "1354-7798"]}
+        )
+        json_data = rv.get_json()
+        assert rv.status_code == 200
+        assert list(json_data["results"].keys()) == ["2291-5222", "1354-7798"]
+        assert json_data["results"]["2291-5222"]["title"] == "JMIR mhealth and uhealth"
+        assert json_data["not_found"] == []
+
+    def test_batch_lookup_secondary_issn(self, api_client):
+        rv = api_client.post("/journals/batch", json={"issns": ["2460-6626"]})
+        json_data = rv.get_json()
+        assert json_data["results"]["2460-6626"]["issn_l"] == "1907-1760"
+
+    def test_batch_lookup_keyed_by_requested_issn(self, api_client):
+        db.session.add(ISSNToISSNL(issn="1234-567X", issn_l="1354-7798"))
+        db.session.commit()
+
+        issns = ["1234-567x", " 2460-6626 ", "2460-6626", "0000-000x"]
+        rv = api_client.post("/journals/batch", json={"issns": issns})
+        json_data = rv.get_json()
+        assert list(json_data["results"].keys()) == issns
+        assert json_data["results"]["1234-567x"]["issn_l"] == "1354-7798"
+        assert json_data["results"][" 2460-6626 "]["issn_l"] == "1907-1760"
+        assert json_data["results"]["2460-6626"]["issn_l"] == "1907-1760"
+        assert json_data["not_found"] == ["0000-000x"]
+
+    def test_batch_lookup_not_found(self, api_client):
+        rv = api_client.post(
+            "/journals/batch", json={"issns": ["2291-5222", "0000-0000"]}
+        )
+        json_data = rv.get_json()
+        assert json_data["results"]["0000-0000"] is None
+        assert json_data["not_found"] == ["0000-0000"]
+
+    def test_batch_lookup_matches_list_schema(self, api_client):
+        rv = api_client.post("/journals/batch", json={"issns": ["2291-5222"]})
+        batch = rv.get_json()["results"]["2291-5222"]
+        rv = api_client.get("/journals-paged")
+        paged = next(
+            item for item in rv.get_json()["results"] if item["issn_l"] == "2291-5222"
+        )
+        assert batch == paged
+
+    def test_batch_lookup_only_fields(self, api_client):
+        rv = api_client.post(
+            "/journals/batch?attrs=issn_l,title", json={"issns": ["1354-7798"]}
+        )
+        json_data = rv.get_json()
+        assert list(json_data["results"]["1354-7798"].keys()) == ["issn_l", "title"]
+
+    def test_batch_lookup_missing_body(self, api_client):
+        rv = api_client.post("/journals/batch")
+        assert rv.status_code == 400
+
+    def test_batch_lookup_too_many_issns(self, api_client):
+        issns = ["{:04d}-{:04d}".format(i, i) for i in range(1001)]
+        rv = api_client.post("/journals/batch", json={"issns": issns})
+        assert rv.status_code == 400
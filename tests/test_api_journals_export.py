@@ -0,0 +1,49 @@
+import csv
+import io
+import json
+
+from tests.conftest import NUMBER_OF_JOURNALS
+
+
+class TestAPIJournalsExport:
+    """Full catalog export: /journals.jsonl and /journals.csv"""
+
+    def test_jsonl(self, api_client):
+        rv = api_client.get("/journals.jsonl")
+        assert rv.status_code == 200
+        assert rv.mimetype == "application/x-ndjson"
+        lines = rv.get_data(as_text=True).splitlines()
+        assert len(lines) == NUMBER_OF_JOURNALS
+
+    def test_jsonl_matches_journals_paged(self, api_client):
+        rv = api_client.get("/journals.jsonl")
+        exported = [json.loads(line) for line in rv.get_data(as_text=True).splitlines()]
+        rv = api_client.get("/journals-paged")
+        assert exported == rv.get_json()["results"]
+
+    def test_jsonl_only_fields(self, api_client):
+        rv = api_client.get("/journals.jsonl?attrs=issn_l,title")
+        for line in rv.get_data(as_text=True).splitlines():
+            assert sorted(json.loads(line).keys()) == ["issn_l", "title"]
+
+    def test_jsonl_publisher_filter(self, api_client):
+        rv = api_client.get("/journals.jsonl?publishers=Universitas Andalas")
+        lines = rv.get_data(as_text=True).splitlines()
+        assert len(lines) == 2
+        for line in lines:
+            assert json.loads(line)["publisher"] == "Universitas Andalas"
+
+    def test_csv(self, api_client):
+        rv = api_client.get("/journals.csv")
+        assert rv.status_code == 200
+        assert rv.mimetype == "text/csv"
+        rows = list(csv.DictReader(io.StringIO(rv.get_data(as_text=True))))
+        assert len(rows) == NUMBER_OF_JOURNALS
+        jmir = next(row for row in rows if row["issn_l"] == "2291-5222")
+        assert jmir["title"] == "JMIR mhealth and uhealth"
+        assert jmir["publisher"] == "JMIR Publications Inc."
+
+    def test_csv_only_fields(self, api_client):
+        rv = api_client.get("/journals.csv?attrs=issn_l,title,journal_metadata")
+        header = rv.get_data(as_text=True).splitlines()[0]
+        assert header == "issn_l,title"
@@ -1,6 +1,27 @@
+from sqlalchemy import event
+
+from app import db
+from models.journal import Journal, Publisher
 from tests.conftest import NUMBER_OF_JOURNALS
 
 
+def count_queries(client, url):
+    """
+    Returns the number of SQL statements executed while serving a request.
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        client.get(url)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+    return len(statements)
+
+
 class TestAPIJournalsPaged:
     """Paginated journals listing: /journals-paged?page=<>&per-page=<>"""
 
@@ -107,3 +128,225 @@ class TestAPIJournalsPaged:
             "title",
             "subscription_pricing",
         ]
+
+    def test_journals_paged_apc_pricing(self, api_client):
+        rv = api_client.get("/journals-paged?attrs=issn_l,apc_pricing,unknown,title")
+        assert rv.status_code == 200
+        sample = rv.get_json()["results"][0]
+        assert list(sample.keys()) == ["issn_l", "title", "apc_pricing"]
+        assert "provenance" in sample["apc_pricing"]
+        assert "apc_metadata" in sample["apc_pricing"]
+
+    def test_journals_paged_query_count_does_not_grow_with_page_size(self, api_client):
+        attrs = (
+            "issn_l,issns,journal_metadata,total_dois,dois_by_issued_year,open_access"
+        )
+        one = count_queries(api_client, "/journals-paged?per-page=1&attrs=" + attrs)
+        # not the last page, which would skip the count
+        full = count_queries(
+            api_client,
+            "/journals-paged?per-page={}&attrs={}".format(
+                NUMBER_OF_JOURNALS - 1, attrs
+            ),
+        )
+        assert one == full
+
+    def test_journals_paged_query_count_full_page(self, api_client):
+        # journal documents lookup, the page of journals with publisher and issn
+        # metadata, six selectin loads (subscription prices, apc metadata, journal
+        # metadata, apc prices, open access, mini bundles), the mini bundle journals
+        # with their subscription, apc and mini bundle prices, doi counts and merged
+        # doi counts; the page is the last one, so its rows complete the count
+        assert count_queries(api_client, "/journals-paged") == 14
+
+    def test_journals_paged_column_attrs_query_count(self, api_client):
+        # count and the page of rows, no journals are loaded
+        url = "/journals-paged?attrs=issn_l,title&per-page=2"
+        assert count_queries(api_client, url) == 2
+        # the rows of the last page complete the count
+        assert count_queries(api_client, url + "&page=2") == 1
+        assert (
+            count_queries(api_client, "/journals-paged?cursor=&attrs=issn_l,title") == 1
+        )
+
+    def test_journals_paged_attrs_skip_pricing(self, api_client):
+        # count, page of rows, journals with issn metadata and publisher joined
+        url = "/journals-paged?attrs=issns,publisher&per-page=2"
+        assert count_queries(api_client, url) == 3
+
+    def test_journals_paged_column_attrs_match_full_results(self, api_client):
+        attrs = ["id", "issn_l", "title", "status"]
+        full = api_client.get("/journals-paged").get_json()["results"]
+        rv = api_client.get("/journals-paged?attrs={}".format(",".join(attrs)))
+        assert rv.get_json()["results"] == [
+            {attr: journal[attr] for attr in attrs} for journal in full
+        ]
+
+    def test_journals_paged_publisher_filter(self, api_client):
+        rv = api_client.get("/journals-paged?publishers=universitas andalas")
+        results = rv.get_json()["results"]
+        assert len(results) == 2
+        assert {r["publisher"] for r in results} == {"Universitas Andalas"}
+
+    def test_journals_paged_publisher_synonym(self, api_client):
+        publisher = Publisher.query.filter_by(name="Universitas Andalas").one()
+        publisher.publisher_synonyms = ["Andalas University"]
+        db.session.commit()
+
+        rv = api_client.get("/journals-paged?publishers=ANDALAS UNIVERSITY")
+        assert {r["publisher"] for r in rv.get_json()["results"]} == {
+            "Universitas Andalas"
+        }
+
+        publisher.publisher_synonyms = None
+        db.session.commit()
+
+    def test_publisher_names_resolved_without_queries(self, api_client):
+        url = "/journals-paged?attrs=issn_l&publishers=Universitas Andalas"
+        count_queries(api_client, url)
+        many = url + ",JMIR Publications Inc.,Wiley,unknown publisher"
+        assert count_queries(api_client, many) == count_queries(api_client, url)
+
+    def test_publisher_index_kept_when_other_rows_change(self, api_client):
+        url = "/journals-paged?attrs=issn_l&publishers=Universitas Andalas"
+        queries = count_queries(api_client, url)
+        journal = Journal.query.filter_by(issn_l="1354-7798").one()
+        journal.is_modified_title = not journal.is_modified_title
+        db.session.commit()
+        assert count_queries(api_client, url) == queries
+
+        publisher = Publisher.query.filter_by(name="Universitas Andalas").one()
+        publisher.publisher_synonyms = ["Andalas University"]
+        db.session.commit()
+        # reloaded with one query
+        assert count_queries(api_client, url) == queries + 1
+
+        publisher.publisher_synonyms = None
+        db.session.commit()
+
+
+class TestAPIJournalsCursor:
+    """Cursor pagination: /journals-paged?cursor=<>&per-page=<>"""
+
+    def test_journals_cursor_first_page(self, api_client):
+        rv = api_client.get("/journals-paged?cursor=&per-page=2")
+        json_data = rv.get_json()
+        assert rv.status_code == 200
+        assert len(json_data["results"]) == 2
+        assert json_data["pagination"]["cursor"] is None
+        assert json_data["pagination"]["next_cursor"]
+        assert json_data["pagination"]["per_page"] == 2
+        assert "count" not in json_data["pagination"]
+
+    def test_journals_cursor_walks_all_journals(self, api_client):
+        rv = api_client.get("/journals-paged")
+        expected = [j["issn_l"] for j in rv.get_json()["results"]]
+
+        walked = []
+        cursor = ""
+        while cursor is not None:
+            rv = api_client.get(
+                "/journals-paged?cursor={}&per-page=1&attrs=issn_l".format(cursor)
+            )
+            json_data = rv.get_json()
+            walked += [j["issn_l"] for j in json_data["results"]]
+            cursor = json_data["pagination"]["next_cursor"]
+
+        assert walked == expected
+        assert len(walked) == NUMBER_OF_JOURNALS
+
+    def test_journals_cursor_link_headers(self, api_client):
+        rv = api_client.get("/journals-paged?cursor=&per-page=1")
+        next_cursor = rv.get_json()["pagination"]["next_cursor"]
+        link_header_expected = (
+            '<https://api.journalsdb.org/journals-paged?cursor=&per-page=1>; rel="first"'
+            ",<https://api.journalsdb.org/journals-paged?cursor={}&per-page=1>; "
+            'rel="next"'.format(next_cursor)
+        )
+        assert rv.headers["Link"] == link_header_expected
+
+    def test_journals_cursor_last_page(self, api_client):
+        rv = api_client.get("/journals-paged?cursor=&per-page=100")
+        json_data = rv.get_json()
+        assert len(json_data["results"]) == NUMBER_OF_JOURNALS
+        assert json_data["pagination"]["next_cursor"] is None
+        assert 'rel="next"' not in rv.headers["Link"]
+
+    def test_journals_invalid_cursor(self, api_client):
+        rv = api_client.get("/journals-paged?cursor=not-a-cursor")
+        assert rv.status_code == 403
+        assert rv.get_json()["message"] == "cursor parameter is invalid"
+
+
+class TestAPIJournalsCount:
+    """Counts of paginated listings: /journals-paged?count=exact|estimate|none"""
+
+    def test_journals_count_none(self, api_client):
+        rv = api_client.get("/journals-paged?count=none&per-page=1&page=2")
+        pagination = rv.get_json()["pagination"]
+        assert pagination == {"page": 2, "per_page": 1}
+        assert rv.headers["Link"] == (
+            "<https://api.journalsdb.org/journals-paged?page=1&per-page=1>; "
+            'rel="first",<https://api.journalsdb.org/journals-paged?page=1&per-page=1>; '
+            'rel="prev",<https://api.journalsdb.org/journals-paged?page=3&per-page=1>; '
+            'rel="next"'
+        )
+
+    def test_journals_count_none_runs_no_count(self, api_client):
+        url = "/journals-paged?attrs=issn_l&per-page=2"
+        exact = count_queries(api_client, url)
+        none = count_queries(api_client, url + "&count=none")
+        assert none == exact - 1
+
+    def test_journals_exact_count_of_last_page(self, api_client):
+        url = "/journals-paged?attrs=issn_l&per-page=3&page=2"
+        assert count_queries(api_client, url) == 1
+        rv = api_client.get(url)
+        pagination = rv.get_json()["pagination"]
+        assert pagination["count"] == NUMBER_OF_JOURNALS
+        assert pagination["pages"] == 2
+
+    def test_journals_count_none_last_page(self, api_client):
+        url = "/journals-paged?count=none&per-page=2&page=2"
+        rv = api_client.get(url)
+        assert len(rv.get_json()["results"]) == 2
+        assert 'rel="next"' not in rv.headers["Link"]
+
+    def test_journals_count_estimate(self, api_client):
+        db.session.execute("ANALYZE journals;")
+        rv = api_client.get("/journals-paged?count=estimate&status=unknown")
+        pagination = rv.get_json()["pagination"]
+        assert pagination["count_estimated"] is True
+        assert isinstance(pagination["count"], int)
+        # no pages, like the link header has no last page
+        assert "pages" not in pagination
+        assert 'rel="last"' not in rv.headers["Link"]
+
+        rv = api_client.get("/journals-paged?count=estimate")
+        assert rv.get_json()["pagination"]["count"] == NUMBER_OF_JOURNALS
+
+    def test_journals_invalid_count(self, api_client):
+        rv = api_client.get("/journals-paged?count=some")
+        assert rv.status_code == 403
+
+    def test_journals_page_out_of_range(self, api_client):
+        rv = api_client.get("/journals-paged?per-page=2&page=3")
+        assert rv.status_code == 404
+
+    def test_journals_exact_count_cached(self, api_client, response_cache):
+        url = "/journals-paged?attrs=issn_l&publishers=Universitas Andalas&per-page=1"
+        api_client.get(url)
+        # a different response, but the same count
+        assert count_queries(api_client, url + "&count=exact") == 1
+        rv = api_client.get(url + "&page=2")
+        assert rv.get_json()["pagination"]["count"] == 2
+
+        journal = Journal.query.filter_by(issn_l="1354-7798").one()
+        publisher = journal.publisher
+        journal.publisher = Publisher.query.filter_by(name="Universitas Andalas").one()
+        db.session.commit()
+        rv = api_client.get(url + "&count=exact")
+        assert rv.get_json()["pagination"]["count"] == 3
+
+        journal.publisher = publisher
+        db.session.commit()
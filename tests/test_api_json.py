@@ -0,0 +1,89 @@
+import datetime
+import decimal
+
+from flask import json
+import pytest
+
+from app import app
+import encoders
+from encoders import PreEncoded
+from models.journal import JournalStatus
+from tests.conftest import NUMBER_OF_JOURNALS
+
+DATA = {
+    "price": decimal.Decimal("1200.50"),
+    "status": JournalStatus.PUBLISHING,
+    "status_as_of": datetime.datetime(2021, 9, 1, 12, 30),
+    "date": datetime.date(2021, 9, 1),
+    "document": PreEncoded('{"issn_l": "1907-1760", "issns": ["2460-6626"]}'),
+    1990: "non-string key",
+}
+
+EXPECTED = {
+    "price": "1200.50",
+    "status": "publishing",
+    "status_as_of": "Wed, 01 Sep 2021 12:30:00 GMT",
+    "date": "Wed, 01 Sep 2021 00:00:00 GMT",
+    "document": {"issn_l": "1907-1760", "issns": ["2460-6626"]},
+    "1990": "non-string key",
+}
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def encoder(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(encoders, "orjson", None)
+
+
+class TestAPIJSON:
+    def test_encodes_api_types(self, api_client, encoder):
+        assert json.loads(json.dumps(DATA)) == EXPECTED
+
+    def test_pretty_printing(self, api_client, encoder):
+        data = {"issn_l": "1907-1760", "issns": ["2460-6626"]}
+        assert json.dumps(data, indent=2) == (
+            '{\n  "issn_l": "1907-1760",\n  "issns": [\n    "2460-6626"\n  ]\n}'
+        )
+
+    def test_compact_responses(self, api_client, encoder, monkeypatch):
+        monkeypatch.setitem(app.config, "JSON_AS_ASCII", False)
+        monkeypatch.setitem(app.config, "JSONIFY_PRETTYPRINT_REGULAR", False)
+        # debug mode always pretty prints
+        monkeypatch.setattr(app, "debug", False)
+        rv = api_client.get("/journals")
+        assert b"\n" not in rv.get_data().strip()
+        assert len(rv.get_json()["results"]) == NUMBER_OF_JOURNALS
+
+    def test_pre_encoded_written_as_is(self, api_client, monkeypatch):
+        pytest.importorskip("orjson")
+        monkeypatch.setitem(app.config, "JSON_AS_ASCII", False)
+        document = PreEncoded('{"title": "Jurnal peternakan Indonesia"}')
+        assert json.dumps({"results": [document]}) == (
+            '{"results":[{"title": "Jurnal peternakan Indonesia"}]}'
+        )
+
+    def test_pre_encoded_is_pretty_printed(self, api_client, encoder):
+        document = PreEncoded('{"issn_l":"1907-1760"}')
+        assert json.dumps({"results": [document]}, indent=2) == (
+            '{\n  "results": [\n    {\n      "issn_l": "1907-1760"\n    }\n  ]\n}'
+        )
+
+    def test_json_as_ascii(self, api_client, encoder):
+        assert app.config["JSON_AS_ASCII"]
+        document = PreEncoded('{"title": "Revista de Educação"}')
+        assert json.dumps({"title": "Ação", "document": document}) == (
+            '{"title": "A\\u00e7\\u00e3o", '
+            '"document": {"title": "Revista de Educa\\u00e7\\u00e3o"}}'
+        )
+
+    def test_json_as_utf8(self, api_client, encoder, monkeypatch):
+        monkeypatch.setitem(app.config, "JSON_AS_ASCII", False)
+        document = PreEncoded('{"title": "Revista de Educação"}')
+        encoded = json.dumps({"title": "Ação", "document": document})
+        assert "\\u" not in encoded
+        assert json.loads(encoded) == {
+            "title": "Ação",
+            "document": {"title": "Revista de Educação"},
+        }
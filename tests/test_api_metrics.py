@@ -0,0 +1,78 @@
+import os
+import re
+import subprocess
+import sys
+
+from tests.conftest import TEST_DATABASE_URI
+
+WORKER = """
+from views import app
+with app.test_client() as client:
+    client.get("/")
+    if {scrape}:
+        print(client.get("/metrics").get_data(as_text=True))
+"""
+
+
+def run_worker(directory, scrape=False):
+    env = dict(
+        os.environ, PROMETHEUS_MULTIPROC_DIR=directory, DATABASE_URL=TEST_DATABASE_URI
+    )
+    return subprocess.run(
+        [sys.executable, "-c", WORKER.format(scrape=scrape)],
+        check=True,
+        capture_output=True,
+        text=True,
+        env=env,
+    ).stdout
+
+
+class TestAPIMetrics:
+    def test_request_metrics(self, api_client):
+        api_client.get("/journals/2291-5222")
+        rv = api_client.get("/metrics")
+        assert rv.status_code == 200
+        assert rv.content_type.startswith("text/plain")
+        text = rv.get_data(as_text=True)
+        assert (
+            'journalsdb_request_duration_seconds_count{endpoint="journal_detail",'
+            'method="GET",status="200"}'
+        ) in text
+        assert 'journalsdb_response_size_bytes_count{endpoint="journal_detail"}' in text
+        assert "journalsdb_db_pool_checked_out" in text
+        assert "journalsdb_resident_memory_bytes" in text
+
+    def test_response_size_is_compressed_size(self, api_client):
+        def size_sum():
+            text = api_client.get("/metrics").get_data(as_text=True)
+            pattern = r'response_size_bytes_sum\{endpoint="journal_changes"\} (\S+)'
+            match = re.search(pattern, text)
+            return float(match.group(1)) if match else 0.0
+
+        before = size_sum()
+        rv = api_client.get(
+            "/journals/changes?documents=true", headers={"Accept-Encoding": "gzip"}
+        )
+        assert rv.headers["Content-Encoding"] == "gzip"
+        assert size_sum() - before == len(rv.get_data())
+
+    def test_cache_metrics(self, api_client, response_cache):
+        api_client.get("/journals")
+        api_client.get("/journals")
+        text = api_client.get("/metrics").get_data(as_text=True)
+        assert (
+            'journalsdb_response_cache_total{endpoint="journals_paged",result="hit"}'
+            in text
+        )
+        assert (
+            'journalsdb_response_cache_total{endpoint="journals_paged",result="miss"}'
+            in text
+        )
+
+    def test_workers_are_added_up(self, api_client, tmp_path):
+        run_worker(str(tmp_path))
+        text = run_worker(str(tmp_path), scrape=True)
+        assert (
+            'journalsdb_request_duration_seconds_count{endpoint="index",'
+            'method="GET",status="200"} 2.0'
+        ) in text
@@ -36,3 +36,36 @@ class TestAPIMisc:
         )
         assert sample
         assert sample["repository_name"] == "Hogskolan Ihalmstad"
+
+    def test_open_access_redirects_to_issn_l(self, api_client):
+        rv = api_client.get("/journals/2460-6626/open-access")
+        assert rv.status_code == 302
+        assert rv.headers["Location"].endswith("/journals/1907-1760/open-access")
+
+    def test_open_access_without_data(self, api_client):
+        rv = api_client.get("/journals/1907-1760/open-access")
+        json_data = rv.get_json()
+        assert json_data["open_access"] == []
+        assert json_data["summary"] == {"num_dois": 0, "num_green": 0, "num_hybrid": 0}
+
+    def test_open_access_batch(self, api_client):
+        single = api_client.get("/journals/2291-5222/open-access").get_json()
+        rv = api_client.post(
+            "/open-access/batch",
+            json={"issns": ["2291-5222", "2460-6626", "0000-0000"]},
+        )
+        json_data = rv.get_json()
+        assert rv.status_code == 200
+        assert json_data["results"]["2291-5222"] == single
+        assert json_data["results"]["2460-6626"]["issn_l"] == "1907-1760"
+        assert json_data["results"]["0000-0000"] is None
+        assert json_data["not_found"] == ["0000-0000"]
+
+    def test_open_access_batch_keyed_by_requested_issn(self, api_client):
+        rv = api_client.post("/open-access/batch", json={"issns": [" 2460-6626 "]})
+        json_data = rv.get_json()
+        assert json_data["results"][" 2460-6626 "]["issn_l"] == "1907-1760"
+
+    def test_open_access_batch_requires_issns(self, api_client):
+        rv = api_client.post("/open-access/batch", json={})
+        assert rv.status_code == 400
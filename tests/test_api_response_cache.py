@@ -0,0 +1,120 @@
+import pytest
+
+import caching
+from app import db
+from caching import CacheInvalidationError
+from models.issn import ISSNToISSNL
+from models.journal import Journal
+
+
+class TestAPIResponseCache:
+    """Cached responses and their invalidation."""
+
+    def test_miss_then_hit(self, api_client, response_cache):
+        rv = api_client.get("/journals/2291-5222")
+        assert rv.headers["X-Cache"] == "MISS"
+        first = rv.get_json()
+
+        rv = api_client.get("/journals/2291-5222")
+        assert rv.headers["X-Cache"] == "HIT"
+        assert rv.get_json() == first
+        assert "ETag" in rv.headers
+
+    def test_hit_is_conditional(self, api_client, response_cache):
+        etag = api_client.get("/journals/2291-5222").headers["ETag"]
+        rv = api_client.get("/journals/2291-5222", headers={"If-None-Match": etag})
+        assert rv.status_code == 304
+
+    def test_normalized_query_string(self, api_client, response_cache):
+        rv = api_client.get("/journals-paged?attrs=issn_l,title&per-page=10")
+        assert rv.headers["X-Cache"] == "MISS"
+        rv = api_client.get("/journals-paged?per-page=10&attrs=title,issn_l")
+        assert rv.headers["X-Cache"] == "HIT"
+
+    def test_redirects_are_not_cached(self, api_client, response_cache):
+        api_client.get("/journals/2460-6626")
+        rv = api_client.get("/journals/2460-6626")
+        assert rv.status_code == 302
+        assert rv.headers["X-Cache"] == "MISS"
+
+    def test_other_spellings_redirect_to_issn_l(self, api_client, response_cache):
+        mapping = ISSNToISSNL(issn="1234-567X", issn_l="2291-5222")
+        db.session.add(mapping)
+        db.session.commit()
+
+        rv = api_client.get("/journals/1234-567x")
+        assert rv.status_code == 302
+        assert rv.headers["Location"].endswith("/journals/2291-5222")
+        rv = api_client.get("/journals/1234-567x/repositories")
+        assert rv.status_code == 302
+        assert rv.headers["Location"].endswith("/journals/2291-5222/repositories")
+
+        db.session.delete(mapping)
+        db.session.commit()
+
+    def test_invalidated_when_journal_changes(self, api_client, response_cache):
+        api_client.get("/journals/1354-7798")
+        api_client.get("/journals-paged")
+
+        journal = Journal.query.filter_by(issn_l="1354-7798").one()
+        journal.title = "European financial management review"
+        db.session.commit()
+
+        rv = api_client.get("/journals/1354-7798")
+        assert rv.headers["X-Cache"] == "MISS"
+        assert rv.get_json()["title"] == "European financial management review"
+        rv = api_client.get("/journals-paged")
+        assert rv.headers["X-Cache"] == "MISS"
+
+    def test_other_journals_stay_cached(self, api_client, response_cache):
+        api_client.get("/journals/2291-5222")
+
+        journal = Journal.query.filter_by(issn_l="1354-7798").one()
+        journal.title = "European financial management"
+        db.session.commit()
+
+        rv = api_client.get("/journals/2291-5222")
+        assert rv.headers["X-Cache"] == "HIT"
+
+    def test_cache_stats(self, api_client, response_cache):
+        api_client.get("/journals/2291-5222/open-access")
+        api_client.get("/journals/2291-5222/open-access")
+        rv = api_client.get("/cache-stats")
+        stats = rv.get_json()["open_access"]
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_cache_stats_skip_redirects_and_errors(self, api_client, response_cache):
+        api_client.get("/journals/2460-6626")
+        api_client.get("/journals/0000-0000")
+        stats = api_client.get("/cache-stats").get_json()["journal_detail"]
+        assert stats["hits"] == 0
+        assert stats["misses"] == 0
+
+    def test_failed_invalidation_is_applied_later(
+        self, api_client, response_cache, monkeypatch
+    ):
+        api_client.get("/journals/1354-7798")
+
+        def cache_down(*args, **kwargs):
+            raise ConnectionError("cache down")
+
+        monkeypatch.setattr(caching, "INVALIDATION_BACKOFF", 0)
+        monkeypatch.setattr(response_cache, "set_many", cache_down)
+        journal = Journal.query.filter_by(issn_l="1354-7798").one()
+        journal.title = "European financial management letters"
+        db.session.commit()
+        with pytest.raises(CacheInvalidationError):
+            caching.apply_pending_invalidations(caching.INVALIDATION_ATTEMPTS)
+
+        # the stale response is not served while the invalidation is pending
+        rv = api_client.get("/journals/1354-7798")
+        assert "X-Cache" not in rv.headers
+        assert rv.get_json()["title"] == "European financial management letters"
+
+        monkeypatch.undo()
+        rv = api_client.get("/journals/1354-7798")
+        assert rv.headers["X-Cache"] == "MISS"
+        assert rv.get_json()["title"] == "European financial management letters"
+        assert not caching.pending_invalidations
@@ -0,0 +1,61 @@
+from flask import json
+import pytest
+
+from app import app
+from models.journal import Journal
+from schemas.compiled import get_dumper
+from schemas.schema_combined import JournalDetailSchema, JournalListSchema
+from utils import journal_load_options, process_only_fields
+
+
+@pytest.fixture
+def fast_serializer():
+    enabled = app.config["FAST_SERIALIZER"]
+    app.config["FAST_SERIALIZER"] = True
+    yield
+    app.config["FAST_SERIALIZER"] = enabled
+
+
+class TestAPISerializer:
+    def load_journals(self, only=None):
+        return (
+            Journal.query.options(*journal_load_options(only))
+            .order_by(Journal.id)
+            .all()
+        )
+
+    @pytest.mark.parametrize(
+        "schema",
+        [
+            JournalListSchema(),
+            JournalDetailSchema(),
+            JournalListSchema(only=("issn_l", "title")),
+            JournalListSchema(only=process_only_fields("issn_l,subscription_pricing")),
+            JournalListSchema(only=process_only_fields("issns,publisher,open_access")),
+        ],
+    )
+    def test_same_output_as_marshmallow(self, api_client, schema):
+        journals = self.load_journals(schema.only)
+        dumper = get_dumper(schema)
+        with app.test_request_context():
+            for journal in journals:
+                assert json.dumps(dumper(journal, False)) == json.dumps(
+                    schema.dump(journal)
+                )
+            assert json.dumps(dumper(journals, True)) == json.dumps(
+                schema.dump(journals, many=True)
+            )
+
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "/journals/2291-5222",
+            "/journals",
+            "/journals?attrs=issn_l,title,subscription_pricing",
+            "/journals.jsonl",
+        ],
+    )
+    def test_same_response_as_marshmallow(self, api_client, fast_serializer, url):
+        fast = api_client.get(url).get_data()
+        app.config["FAST_SERIALIZER"] = False
+        assert api_client.get(url).get_data() == fast
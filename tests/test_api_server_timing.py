@@ -0,0 +1,57 @@
+import logging
+
+import pytest
+
+from app import app
+from timing import fingerprint
+
+
+@pytest.fixture
+def server_timing(monkeypatch):
+    monkeypatch.setitem(app.config, "SERVER_TIMING", True)
+
+
+class TestAPIServerTiming:
+    def test_off_by_default(self, api_client):
+        rv = api_client.get("/journals")
+        assert "Server-Timing" not in rv.headers
+        assert "X-Query-Count" not in rv.headers
+
+    def test_headers(self, api_client, server_timing):
+        rv = api_client.get("/journals?attrs=issn_l,title,publisher")
+        assert rv.status_code == 200
+        phases = [t.split(";")[0] for t in rv.headers["Server-Timing"].split(", ")]
+        assert phases == ["db", "serialize", "encode", "total"]
+        assert int(rv.headers["X-Query-Count"]) > 0
+
+    def test_cache_hit_has_no_queries(self, api_client, response_cache, server_timing):
+        api_client.get("/journals")
+        rv = api_client.get("/journals")
+        assert rv.headers["X-Cache"] == "HIT"
+        assert rv.headers["X-Query-Count"] == "0"
+
+    def test_over_budget_is_logged(
+        self, api_client, server_timing, monkeypatch, caplog
+    ):
+        monkeypatch.setitem(app.config, "QUERY_BUDGET", 0)
+        with caplog.at_level(logging.WARNING):
+            api_client.get("/journals/2291-5222/open-access")
+        messages = [r.getMessage() for r in caplog.records]
+        assert any(
+            m.startswith("over budget: GET /journals/2291-5222/open-access")
+            and "1x SELECT" in m
+            for m in messages
+        )
+
+    def test_within_budget_is_not_logged(self, api_client, server_timing, caplog):
+        with caplog.at_level(logging.WARNING):
+            api_client.get("/journals/2291-5222/open-access")
+        assert not [r for r in caplog.records if "over budget" in r.getMessage()]
+
+    def test_fingerprint(self):
+        assert fingerprint(
+            "SELECT * FROM journals\n WHERE id IN (%(id_1)s, %(id_2)s) AND year > 2009"
+        ) == fingerprint("SELECT * FROM journals WHERE id IN (%(id_1)s) AND year > 10")
+        assert fingerprint("SELECT 'a' FROM t WHERE x = %(x)s") == (
+            "SELECT ? FROM t WHERE x = ?"
+        )
@@ -0,0 +1,52 @@
+import importlib
+
+from click import Context
+
+import caching
+import commands
+from app import app, cache
+from commands import COMMAND_MODULES
+
+
+class TestCommands:
+    def test_commands_are_registered_by_their_module(self):
+        ctx = Context(app.cli)
+        for name, module in COMMAND_MODULES.items():
+            command = app.cli.get_command(ctx, name)
+            assert command is not None, name
+            assert command.callback.__module__ == module
+
+    def test_every_command_is_listed(self):
+        for module in set(COMMAND_MODULES.values()):
+            importlib.import_module(module)
+        assert set(app.cli.commands) <= set(COMMAND_MODULES)
+        assert set(COMMAND_MODULES) <= set(app.cli.list_commands(Context(app.cli)))
+
+    def test_command_fails_when_invalidation_is_pending(
+        self, ingest_client, monkeypatch
+    ):
+        def cache_down(*args, **kwargs):
+            raise ConnectionError("cache down")
+
+        monkeypatch.setattr(caching, "INVALIDATION_BACKOFF", 0)
+        monkeypatch.setattr(cache, "set_many", cache_down)
+        monkeypatch.setattr(caching, "pending_invalidations", {"journal:2291-5222"})
+
+        runner = app.test_cli_runner()
+        result = runner.invoke(args=["prune_journal_changes", "--days", "90"])
+        assert result.exit_code == 1
+        assert "were not invalidated" in result.output
+
+        monkeypatch.undo()
+        result = runner.invoke(args=["prune_journal_changes", "--days", "90"])
+        assert result.exit_code == 0, result.output
+
+    def test_invalidation_check_registered_once(self, monkeypatch):
+        checks = []
+        monkeypatch.setattr(
+            commands, "fail_on_pending_invalidations", lambda: checks.append(1)
+        )
+        with Context(app.cli) as ctx:
+            for name in app.cli.list_commands(ctx):
+                app.cli.get_command(ctx, name)
+        assert checks == [1]
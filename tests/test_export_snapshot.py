@@ -0,0 +1,75 @@
+import csv
+import gzip
+import hashlib
+import json
+
+import pytest
+
+from app import app
+from ingest.snapshot import SNAPSHOT_TABLES, export_snapshot
+
+
+@pytest.fixture(scope="module")
+def snapshot(api_client, tmp_path_factory):
+    """
+    Directory with a snapshot of the sample API data, in chunks of 2 rows.
+    """
+    pytest.importorskip("pyarrow")
+    directory = tmp_path_factory.mktemp("snapshot")
+    runner = app.test_cli_runner()
+    result = runner.invoke(
+        export_snapshot, ["--directory", str(directory), "--chunk_size", "2"]
+    )
+    assert result.exit_code == 0, result.output
+    return directory
+
+
+def read_csv(path):
+    with gzip.open(path, "rt", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+class TestExportSnapshot:
+    def test_manifest(self, snapshot):
+        manifest = json.loads((snapshot / "manifest.json").read_text())
+        assert list(manifest["tables"]) == list(SNAPSHOT_TABLES)
+        for name, table in manifest["tables"].items():
+            assert [f["path"] for f in table["files"]] == [
+                "{}.parquet".format(name),
+                "{}.csv.gz".format(name),
+            ]
+            for entry in table["files"]:
+                data = (snapshot / entry["path"]).read_bytes()
+                assert entry["bytes"] == len(data)
+                assert entry["sha256"] == hashlib.sha256(data).hexdigest()
+            assert len(read_csv(snapshot / "{}.csv.gz".format(name))) == table["rows"]
+        assert manifest["tables"]["journals"]["rows"] == 4
+
+    def test_parquet_columns_are_typed(self, snapshot):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        journals = pq.read_table(snapshot / "journals.parquet")
+        assert journals.num_rows == 4
+        assert journals.schema.field("id").type == pa.int32()
+        assert journals.schema.field("created_at").type == pa.timestamp("us")
+
+        prices = pq.read_table(snapshot / "subscription_prices.parquet")
+        assert prices.schema.field("price").type == pa.decimal128(10, 2)
+        assert prices.num_rows == len(read_csv(snapshot / "subscription_prices.csv.gz"))
+
+    def test_doi_counts_by_year(self, snapshot):
+        rows = read_csv(snapshot / "doi_counts.csv.gz")
+        counts = {
+            (row["year"], row["num_dois"])
+            for row in rows
+            if row["issn_l"] == "2291-5222"
+        }
+        assert counts == {("2021", "2"), ("2020", "2")}
+
+    def test_open_access_by_year(self, snapshot):
+        import pyarrow.parquet as pq
+
+        open_access = pq.read_table(snapshot / "open_access.parquet").to_pydict()
+        assert "2291-5222" in open_access["issn_l"]
+        assert all(isinstance(year, int) for year in open_access["year"])
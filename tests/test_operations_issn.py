@@ -0,0 +1,55 @@
+from app import db
+from models.usage import RetractionSummary
+from models.versions import JournalVersion
+from operations.issn.issn_merge_issn import MergeIssn
+from operations.issn.issn_move_issn import MoveIssn
+from tests.factories import import_api_test_data
+
+
+def add_retractions(issn):
+    db.session.add(
+        RetractionSummary(
+            id=2,
+            issn=issn,
+            issn_l=issn,
+            journal="Living Today",
+            year=2019,
+            retractions=2,
+            num_dois=10,
+            percent_retracted=20.0,
+        )
+    )
+    db.session.commit()
+
+
+def retraction_years(client, issn_l):
+    retractions = client.get("/journals/{}".format(issn_l)).get_json()["retractions"]
+    return retractions["retractions_by_year"] if retractions else []
+
+
+def test_merge_issn_moves_retractions(ingest_client):
+    import_api_test_data()
+    add_retractions("5577-4444")
+    version = JournalVersion.query.get("1354-7798").version
+
+    MergeIssn("5577-4444", "1354-7798").merge_issn()
+
+    assert RetractionSummary.query.filter_by(issn="5577-4444").one().issn_l == (
+        "1354-7798"
+    )
+    assert retraction_years(ingest_client, "1354-7798") == [
+        {"year": 2019, "retractions": 2, "percent_retracted": 20.0}
+    ]
+    assert JournalVersion.query.get("1354-7798").version > version
+
+
+def test_move_issn_moves_retractions(ingest_client):
+    import_api_test_data()
+    add_retractions("5577-4444")
+
+    MoveIssn("5577-4444", "1354-7798").move_issn()
+
+    assert RetractionSummary.query.filter_by(issn="5577-4444").one().issn_l == (
+        "1354-7798"
+    )
+    assert len(retraction_years(ingest_client, "1354-7798")) == 1
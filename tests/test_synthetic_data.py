@@ -0,0 +1,57 @@
+from app import app
+from ingest.synthetic_data import generate_synthetic_data, issn
+from models.issn import ISSNToISSNL
+from models.journal import Journal
+from models.usage import DOICountMerged, OpenAccess
+from models.versions import JournalChange, JournalVersion
+
+
+def test_issn_check_digit():
+    assert issn(2291522) == "2291-5222"
+    assert issn(28083) == "0028-0836"
+    assert issn(2434561) == "2434-561X"
+
+
+def test_generate_synthetic_data(ingest_client):
+    runner = app.test_cli_runner()
+    result = runner.invoke(
+        generate_synthetic_data, ["--journals", "300", "--issns", "1000"]
+    )
+    assert result.exit_code == 0, result.output
+
+    # the four journals of the seed data come first
+    assert Journal.query.count() == 304
+    assert Journal.query.get(1).issn_l == "2291-5222"
+    assert ISSNToISSNL.query.count() >= 1000
+    assert OpenAccess.query.count() > 300
+    assert JournalVersion.query.count() == 304
+    assert JournalChange.query.count() >= 304
+
+    # previous issn_ls are merged into the doi counts of their journal
+    journal = Journal.query.filter(Journal.id > 4).first()
+    assert DOICountMerged.query.count() > 200
+    rv = ingest_client.get("/journals/{}".format(journal.issn_l))
+    assert rv.status_code == 200
+
+    rv = ingest_client.get("/journals?per-page=1")
+    assert rv.get_json()["pagination"]["count"] == 304
+
+
+def test_requires_empty_database(ingest_client):
+    runner = app.test_cli_runner()
+    args = ["--journals", "10", "--issns", "10"]
+    assert runner.invoke(generate_synthetic_data, args).exit_code == 0
+    result = runner.invoke(generate_synthetic_data, args)
+    assert result.exit_code != 0
+    assert "empty database" in result.output
+
+
+def test_rejects_volumes_beyond_issn_range(ingest_client):
+    runner = app.test_cli_runner()
+    result = runner.invoke(generate_synthetic_data, ["--journals", "600001"])
+    assert result.exit_code == 2
+    assert "--journals" in result.output
+    result = runner.invoke(generate_synthetic_data, ["--issns", "3000001"])
+    assert result.exit_code == 2
+    assert "--issns" in result.output
+    assert Journal.query.count() == 0
@@ -0,0 +1,134 @@
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# phases of the Server-Timing header, in header order
+PHASES = ["db", "serialize", "encode"]
+TOP_STATEMENTS = 3
+
+PARAMETER = re.compile(r"%\(\w+\)s|\$\d+|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+PARAMETER_LIST = re.compile(r"\(\?(?:, \?)*\)")
+WHITESPACE = re.compile(r"\s+")
+
+
+class RequestTiming:
+    """
+    Time spent in each phase of a request and the statements it ran, kept on flask.g
+    while SERVER_TIMING is on.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        self.statements = Counter()
+
+    @property
+    def query_count(self):
+        return sum(self.statements.values())
+
+    def total_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+    def header(self):
+        timings = [
+            "{};dur={:.1f}".format(phase, self.durations[phase] * 1000)
+            for phase in PHASES
+        ]
+        timings.append("total;dur={:.1f}".format(self.total_ms()))
+        return ", ".join(timings)
+
+
+def current_timing():
+    if has_request_context():
+        return g.get("request_timing")
+    return None
+
+
+@contextmanager
+def timed(phase):
+    """
+    Adds the time spent in the block to a phase of the current request. Queries run
+    in the block, such as lazy loads while serializing, count as db time only.
+    """
+    timing = current_timing()
+    if timing is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    db_start = timing.durations["db"]
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timing.durations[phase] += elapsed - (timing.durations["db"] - db_start)
+
+
+def fingerprint(statement):
+    """
+    Statement with its parameters and literals replaced, so repeats of the same query
+    with other values are counted together.
+    """
+    statement = WHITESPACE.sub(" ", statement).strip()
+    statement = PARAMETER_LIST.sub("(...)", PARAMETER.sub("?", statement))
+    return statement[:200]
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if current_timing() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    timing = current_timing()
+    if timing is None or not conn.info.get("query_start"):
+        return
+    timing.durations["db"] += time.perf_counter() - conn.info["query_start"].pop()
+    timing.statements[fingerprint(statement)] += 1
+
+
+def init_app(app):
+    """
+    Adds Server-Timing and X-Query-Count headers to responses when SERVER_TIMING is
+    on, and logs requests over QUERY_BUDGET queries or LATENCY_BUDGET_MS.
+    """
+
+    @app.before_request
+    def start_request_timing():
+        if app.config["SERVER_TIMING"]:
+            g.request_timing = RequestTiming()
+
+    @app.after_request
+    def add_timing_headers(response):
+        timing = g.pop("request_timing", None)
+        if timing is None:
+            return response
+
+        response.headers["Server-Timing"] = timing.header()
+        response.headers["X-Query-Count"] = str(timing.query_count)
+
+        total_ms = timing.total_ms()
+        if (
+            timing.query_count > app.config["QUERY_BUDGET"]
+            or total_ms > app.config["LATENCY_BUDGET_MS"]
+        ):
+            top = "; ".join(
+                "{}x {}".format(count, statement)
+                for statement, count in timing.statements.most_common(TOP_STATEMENTS)
+            )
+            app.logger.warning(
+                "over budget: %s %s took %.0fms with %d queries, top statements: %s",
+                request.method,
+                request.full_path,
+                total_ms,
+                timing.query_count,
+                top,
+            )
+        return response
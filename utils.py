@@ -1,20 +1,77 @@
+import base64
+from datetime import datetime, timezone
+import threading
+import time
 from urllib.parse import unquote
 
-from exceptions import APIPaginationError
-from models.journal import Publisher, JournalStatus
+from flask_sqlalchemy import Pagination
+from sqlalchemy import event
+from sqlalchemy.orm import (
+    configure_mappers,
+    joinedload,
+    lazyload,
+    load_only,
+    selectinload,
+)
+
+from app import db
+from exceptions import APIBatchError, APIPaginationError
+from models.journal import Journal, Publisher, JournalStatus
+from models.price import MiniBundle
 from schemas.schema_combined import JournalListSchema
 
+# relationships read by JournalListSchema fields, used to build the eager loading plan
+FIELD_RELATIONSHIPS = {
+    "issns": ["issn_metadata"],
+    "previous_issn_ls": ["issn_metadata"],
+    "journal_metadata": ["journal_metadata"],
+    "total_dois": ["doi_counts_merged"],
+    "dois_by_issued_year": ["doi_counts_merged"],
+    "sample_dois": ["doi_counts"],
+    "publisher": ["publisher"],
+    "sub_data_source": ["publisher"],
+    "apc_source": ["apc_metadata", "publisher"],
+    "apc_metadata": ["apc_metadata"],
+    "subscription_prices": ["subscription_prices"],
+    "apc_prices": ["apc_prices"],
+    "mini_bundles": ["mini_bundles"],
+    "open_access_recent": ["open_access"],
+}
+
+# journals columns read by JournalListSchema fields, fields not listed need relationships
+FIELD_COLUMNS = {
+    "id": ["uuid"],
+    "issn_l": ["issn_l"],
+    "title": ["title"],
+    "other_titles": ["other_titles"],
+    "date_last_doi": ["date_last_doi"],
+    "status": ["status"],
+    "status_as_of": ["status_as_of"],
+}
+
+# ways to count the journals of a paginated listing, the first is the default
+COUNT_TYPES = ["exact", "estimate", "none"]
 
-def build_link_header(query, base_url, per_page):
+# relationships loaded by default for every journal, skipped when no field needs them
+DEFAULT_EAGER_RELATIONSHIPS = ["apc_prices", "publisher", "subscription_prices"]
+
+
+def build_link_header(query, base_url, per_page, next_cursor=None):
     """
     Adds pagination link headers to an API response.
+    When query is None the links are built for cursor pagination instead of page numbers.
     """
-    links = [
-        '<{0}?page=1&per-page={1}>; rel="first"'.format(base_url, per_page),
-        '<{0}?page={1}&per-page={2}>; rel="last"'.format(
-            base_url, query.pages, per_page
-        ),
-    ]
+    if query is None:
+        return build_cursor_link_header(base_url, per_page, next_cursor)
+
+    links = ['<{0}?page=1&per-page={1}>; rel="first"'.format(base_url, per_page)]
+    # without an exact count the last page is unknown
+    if query.pages is not None:
+        links.append(
+            '<{0}?page={1}&per-page={2}>; rel="last"'.format(
+                base_url, query.pages, per_page
+            )
+        )
     if query.has_prev:
         links.append(
             '<{0}?page={1}&per-page={2}>; rel="prev"'.format(
@@ -32,6 +89,100 @@ def build_link_header(query, base_url, per_page):
     return dict(Link=links)
 
 
+class JournalsPage(Pagination):
+    """
+    Page of journals where has_next comes from fetching one row more than per_page, so
+    it is known without a count. total is None when the count was not run.
+    """
+
+    def __init__(self, page, per_page, total, items, has_next):
+        super().__init__(None, page, per_page, total, items)
+        self._has_next = has_next
+
+    @property
+    def pages(self):
+        if self.total is None:
+            return None
+        return super().pages
+
+    @property
+    def has_next(self):
+        return self._has_next
+
+
+def build_cursor_link_header(base_url, per_page, next_cursor):
+    """
+    Cursor pages have no last or previous page, only a way to start over and continue.
+    """
+    links = ['<{0}?cursor=&per-page={1}>; rel="first"'.format(base_url, per_page)]
+    if next_cursor:
+        links.append(
+            '<{0}?cursor={1}&per-page={2}>; rel="next"'.format(
+                base_url, next_cursor, per_page
+            )
+        )
+
+    links = ",".join(links)
+    return dict(Link=links)
+
+
+def encode_cursor(journal):
+    """
+    Opaque cursor pointing at a journal's position in the (created_at, id) ordering.
+    """
+    value = "{}|{}".format(journal.created_at.isoformat(), journal.id)
+    return base64.urlsafe_b64encode(value.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Returns the (created_at, id) keyset values stored in a cursor.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value = base64.urlsafe_b64decode(padded.encode()).decode()
+        created_at, journal_id = value.split("|")
+        return datetime.fromisoformat(created_at), int(journal_id)
+    except ValueError:
+        raise APIPaginationError("cursor parameter is invalid")
+
+
+def encode_change_cursor(txid, change_id):
+    """
+    Opaque cursor pointing at a journal change's position in the (txid, id) ordering.
+    """
+    value = "{}|{}".format(txid, change_id)
+    return base64.urlsafe_b64encode(value.encode()).decode().rstrip("=")
+
+
+def decode_change_cursor(cursor):
+    """
+    Returns the (txid, id) keyset values stored in a change cursor.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value = base64.urlsafe_b64decode(padded.encode()).decode()
+        txid, change_id = value.split("|")
+        return int(txid), int(change_id)
+    except ValueError:
+        raise APIPaginationError("cursor parameter is invalid")
+
+
+def validate_since(since):
+    """
+    Naive UTC datetime of the since parameter, as journal changes are stored.
+    """
+    if not since:
+        return None
+    try:
+        since = datetime.fromisoformat(since.replace("Z", "+00:00"))
+    except ValueError:
+        raise APIPaginationError("since parameter must be an ISO 8601 timestamp")
+    if since.tzinfo:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since
+
+
 def process_only_fields(attrs):
     """
     Some fields in attrs must be renamed and added in order to make filtering work.
@@ -46,7 +197,7 @@ def process_only_fields(attrs):
 
     if "apc_pricing" in only:
         only.remove("apc_pricing")
-        only = only + ["apc_prices", "apc_data_source"]
+        only = only + ["apc_prices", "apc_source", "apc_metadata"]
 
     if "open_access" in only:
         only.remove("open_access")
@@ -54,32 +205,226 @@ def process_only_fields(attrs):
 
     # remove any invalid fields
     schema_fields = [j for j in JournalListSchema._declared_fields]
+    return [field for field in only if field in schema_fields]
+
+
+def journal_load_options(only=None):
+    """
+    Eager loading plan for JournalListSchema based on the displayed fields.
+    Each relationship is loaded for the whole page with one query, so the number of
+    queries does not grow with per-page. With attrs, only the journals columns and
+    relationships the displayed fields read are loaded.
+    """
+    # backrefs such as Journal.mini_bundles only exist once mappers are configured
+    configure_mappers()
+    loaders = {
+        "apc_metadata": selectinload(Journal.apc_metadata),
+        "apc_prices": selectinload(Journal.apc_prices),
+        "doi_counts": selectinload(Journal.doi_counts),
+        "doi_counts_merged": selectinload(Journal.doi_counts_merged),
+        "issn_metadata": joinedload(Journal.issn_metadata),
+        "journal_metadata": selectinload(Journal.journal_metadata),
+        "mini_bundles": selectinload(Journal.mini_bundles).selectinload(
+            MiniBundle.mini_bundle_prices
+        ),
+        "open_access": selectinload(Journal.open_access),
+        "publisher": joinedload(Journal.publisher),
+        "subscription_prices": selectinload(Journal.subscription_prices),
+    }
+    fields = only if only is not None else JournalListSchema._declared_fields.keys()
+    relationships = {
+        relationship
+        for field in fields
+        for relationship in FIELD_RELATIONSHIPS.get(field, [])
+    }
+    options = [loaders[relationship] for relationship in sorted(relationships)]
+
+    if only is not None:
+        # issn_l and publisher_id are the keys relationships are loaded with
+        columns = {"issn_l", "publisher_id"}
+        for field in only:
+            columns.update(FIELD_COLUMNS.get(field, []))
+        options.append(load_only(*[getattr(Journal, c) for c in sorted(columns)]))
+        options += [
+            lazyload(getattr(Journal, relationship))
+            for relationship in DEFAULT_EAGER_RELATIONSHIPS
+            if relationship not in relationships
+        ]
+    return options
+
+
+def only_columns(only):
+    """
+    The journals columns displayed fields read, or None when a field needs a
+    relationship or a property. Pages of these fields are dumped straight from the
+    rows of the page query.
+    """
+    if only is None or not only:
+        return None
+
+    columns = []
     for field in only:
-        if field not in schema_fields:
-            only.remove(field)
+        if field not in FIELD_COLUMNS:
+            return None
+        columns += FIELD_COLUMNS[field]
+    return columns
+
+
+def load_journals(journal_ids, only=None):
+    """
+    Loads journals by id with the eager loading plan, in the order of journal_ids.
+    """
+    if not journal_ids:
+        return []
+
+    journals = (
+        Journal.query.options(*journal_load_options(only))
+        .filter(Journal.id.in_(journal_ids))
+        .all()
+    )
+    journals_by_id = {j.id: j for j in journals}
+    return [journals_by_id[journal_id] for journal_id in journal_ids]
+
+
+def estimate_count(query):
+    """
+    Number of rows the planner expects the query to return, without running it.
+    """
+    statement = query.statement.compile(
+        dialect=db.engine.dialect, compile_kwargs={"literal_binds": True}
+    )
+    plan = (
+        db.session.connection()
+        .execute("EXPLAIN (FORMAT JSON) {}".format(statement))
+        .scalar()
+    )
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def estimate_table_count(table_name):
+    """
+    Row count postgres keeps for a table, updated by vacuum and analyze. None when the
+    table was never analyzed.
+    """
+    reltuples = db.session.execute(
+        "SELECT reltuples FROM pg_class WHERE oid = CAST(:table_name AS regclass);",
+        {"table_name": table_name},
+    ).scalar()
+    return int(reltuples) if reltuples is not None and reltuples >= 0 else None
+
 
-    return only
+class PublisherIndex:
+    """
+    Case-folded publisher names and synonyms mapped to publisher ids, loaded with one
+    query and kept in process memory. It is reloaded when older than ttl seconds, or
+    after publishers are written through the ORM in this process. Other processes,
+    such as the other web workers, only see such changes once their copy expires, so
+    they can match stale publisher names for up to ttl seconds.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.names = {}
+        self.synonyms = {}
+        self.loaded_at = None
+        self.lock = threading.Lock()
+
+    def ids(self, name):
+        """
+        Ids of the publisher with this name or, when there is none, of the publishers
+        with this synonym.
+        """
+        self.refresh()
+        key = name.strip().casefold()
+        if key in self.names:
+            return [self.names[key]]
+        return self.synonyms.get(key, [])
+
+    def refresh(self):
+        with self.lock:
+            if self.loaded_at and time.monotonic() - self.loaded_at < self.ttl:
+                return
+            names = {}
+            synonyms = {}
+            rows = db.session.query(
+                Publisher.id, Publisher.name, Publisher.publisher_synonyms
+            ).order_by(Publisher.id)
+            for publisher_id, name, publisher_synonyms in rows:
+                names[name.strip().casefold()] = publisher_id
+                for synonym in publisher_synonyms or []:
+                    ids = synonyms.setdefault(synonym.strip().casefold(), [])
+                    if publisher_id not in ids:
+                        ids.append(publisher_id)
+            self.names, self.synonyms = names, synonyms
+            self.loaded_at = time.monotonic()
+
+    def clear(self):
+        self.loaded_at = None
+
+
+publisher_index = PublisherIndex()
+
+
+@event.listens_for(Publisher, "after_insert")
+@event.listens_for(Publisher, "after_update")
+@event.listens_for(Publisher, "after_delete")
+def clear_publisher_index(mapper, connection, target):
+    publisher_index.clear()
 
 
 def get_publisher_ids(publisher_names):
-    publisher_names = publisher_names.split(",")
+    """
+    Publisher ids for comma-separated publisher names or synonyms, case-insensitive.
+    Resolved from the in-memory publisher index, without a query per name.
+    """
     publisher_ids = []
-    for name in publisher_names:
+    for name in publisher_names.split(","):
         name = unquote(name)  # convert special characters back to string
-        publisher = Publisher.query.filter(Publisher.name.ilike(name)).first()
-        if publisher:
-            publisher_ids.append(publisher.id)
+        for publisher_id in publisher_index.ids(name):
+            if publisher_id not in publisher_ids:
+                publisher_ids.append(publisher_id)
 
     return publisher_ids
 
 
-def validate_per_page(per_page):
-    if per_page and per_page > 100 or per_page < 1:
-        raise APIPaginationError("per-page parameter must be between 1 and 100")
+def validate_batch_issns(data, max_size=1000):
+    """
+    Returns the de-duplicated ISSNs from a batch request body, in request order,
+    mapped to their stripped, upper case form to look up. Results are keyed by the
+    ISSNs as sent, so clients find their own keys.
+    """
+    issns = data.get("issns") if isinstance(data, dict) else None
+    if not isinstance(issns, list) or not issns:
+        raise APIBatchError("request body must contain a list of issns")
+
+    if not all(isinstance(issn, str) for issn in issns):
+        raise APIBatchError("issns must be strings")
+
+    issns = {issn: issn.strip().upper() for issn in issns}
+    if len(issns) > max_size:
+        raise APIBatchError("a batch can contain at most {} issns".format(max_size))
+
+    return issns
+
+
+def validate_per_page(per_page, maximum=100):
+    if per_page and per_page > maximum or per_page < 1:
+        raise APIPaginationError(
+            "per-page parameter must be between 1 and {}".format(maximum)
+        )
 
     return per_page
 
 
+def validate_count(count):
+    if count not in COUNT_TYPES:
+        raise APIPaginationError(
+            "count parameter must be one of {}".format(", ".join(COUNT_TYPES))
+        )
+
+    return count
+
+
 def validate_status(status):
     valid_status_values = [j.value for j in JournalStatus]
     if status and status in valid_status_values:
@@ -1,21 +1,74 @@
-from flask import abort, jsonify, redirect, request, url_for
+import csv
+import io
+from math import ceil
+
+from flask import (
+    abort,
+    json,
+    jsonify,
+    make_response,
+    redirect,
+    request,
+    stream_with_context,
+    url_for,
+)
 from flasgger import swag_from
+from sqlalchemy import and_, func, or_, tuple_
+from sqlalchemy.orm import joinedload
 
 from app import app, db
+from caching import (
+    JOURNALS_TAG,
+    cached_count,
+    cached_response,
+    get_cache_stats,
+    journal_tag,
+)
+from encoders import PreEncoded
 from exceptions import APIError
-from models.journal import Journal
+from models.journal import Journal, JournalDocument
 from models.usage import OpenAccess, Repository
+from models.versions import JournalChange, JournalVersion
 from models.issn import MissingJournal
+from schemas.compiled import dump
 from schemas.schema_combined import JournalDetailSchema, JournalListSchema
 from utils import (
+    JournalsPage,
     build_link_header,
+    decode_change_cursor,
+    decode_cursor,
+    encode_change_cursor,
+    encode_cursor,
+    estimate_count,
+    estimate_table_count,
     get_publisher_ids,
+    journal_load_options,
+    load_journals,
+    only_columns,
     process_only_fields,
+    validate_batch_issns,
+    validate_count,
     validate_per_page,
+    validate_since,
     validate_status,
 )
 
 SITE_URL = "https://api.journalsdb.org"
+EXPORT_CHUNK_SIZE = 500
+CHANGES_PER_PAGE = 1000
+CSV_FIELDS = [
+    "id",
+    "issn_l",
+    "issns",
+    "title",
+    "publisher",
+    "previous_issn_ls",
+    "other_titles",
+    "total_dois",
+    "sub_data_source",
+    "apc_source",
+    "date_last_doi",
+]
 
 
 @app.route("/")
@@ -31,92 +84,477 @@ def index():
 
 @app.route("/journals/<issn>")
 @swag_from("docs/journal.yml")
+@cached_response(lambda issn: [journal_tag(issn)])
 def journal_detail(issn):
+    version = JournalVersion.find_by_issn_l(issn)
+    if not_modified(version):
+        return versioned(app.response_class(status=304), version)
+
+    if version:
+        # pre-rendered by flask build_journal_documents, one primary key lookup
+        detail_json = (
+            db.session.query(JournalDocument.detail_json)
+            .filter_by(issn_l=issn, version=version.version)
+            .scalar()
+        )
+        if detail_json:
+            return versioned(
+                app.response_class(detail_json, mimetype="application/json"), version
+            )
+
     journal = Journal.find_by_issn(issn.upper())
 
     if not journal:
         return abort(404, description="Resource not found")
 
-    elif journal.issn_l != issn and issn in journal.issns:
-        # redirect to primary issn_l
+    elif journal.issn_l != issn:
+        # redirect other issns and spellings to the issn_l, so only issn_l paths are
+        # cached, under the tag that journal changes invalidate
         return redirect(url_for("journal_detail", issn=journal.issn_l))
 
     journal_detail_schema = JournalDetailSchema()
-    return journal_detail_schema.dump(journal)
+    return versioned(make_response(dump(journal_detail_schema, journal)), version)
 
 
 @app.route("/journals-paged")
 @app.route("/journals")
 @swag_from("docs/journals.yml")
+@cached_response(lambda: [JOURNALS_TAG])
 def journals_paged():
     # process query parameters
     page = request.args.get("page", 1, type=int)
     per_page = validate_per_page(request.args.get("per-page", 100, type=int))
+    cursor = request.args.get("cursor")
     attrs = request.args.get("attrs")
     only = process_only_fields(attrs) if attrs else None
     publishers = request.args.get("publishers")
     publisher_ids = get_publisher_ids(publishers) if publishers else []
     valid_status = validate_status(request.args.get("status"))
+    count = validate_count(request.args.get("count", "exact"))
+
+    journals = journal_rows(only, publisher_ids, valid_status)
+
+    if cursor is not None:
+        return journals_by_cursor(journals, cursor, per_page, only)
+
+    # pagination, one extra row tells if there is a next page without a count
+    if page < 1:
+        abort(404)
+    rows = journals.limit(per_page + 1).offset((page - 1) * per_page).all()
+    if not rows and page != 1:
+        abort(404)
+    if count == "exact" and len(rows) <= per_page:
+        # the last page, its rows complete the count
+        total = (page - 1) * per_page + len(rows)
+    else:
+        total = count_journals(count, publisher_ids, valid_status)
+    journals = JournalsPage(
+        page,
+        per_page,
+        total if count == "exact" else None,
+        rows[:per_page],
+        len(rows) > per_page,
+    )
 
-    # primary query
-    journals = Journal.query.order_by(Journal.created_at.asc())
+    if count == "none":
+        pagination = {"page": page, "per_page": per_page}
+    else:
+        pagination = {"count": total, "page": page, "per_page": per_page}
+    if count == "exact":
+        pagination["pages"] = ceil(total / per_page)
+    elif count == "estimate":
+        # the pages of an estimate are unknown, as in the link header
+        pagination["count_estimated"] = True
+
+    # paginated link headers
+    base_url = SITE_URL + "/journals-paged"
+    link_header = build_link_header(
+        query=journals, base_url=base_url, per_page=per_page
+    )
+    return journal_list_response(journals.items, only, pagination, link_header)
 
-    # filters
+
+def count_journals(count, publisher_ids, valid_status):
+    """
+    Journals matching the filters. Exact counts are cached until journals change,
+    estimates come from postgres statistics and none skips counting.
+    """
+    if count == "none":
+        return None
+
+    journals = filter_journals(
+        db.session.query(Journal.id), publisher_ids, valid_status
+    )
+    if count == "estimate":
+        estimate = None
+        if not publisher_ids and not valid_status:
+            estimate = estimate_table_count("journals")
+        return estimate if estimate is not None else estimate_count(journals)
+
+    name = "journals?publishers={}&status={}".format(
+        ",".join(str(i) for i in sorted(publisher_ids)), valid_status or ""
+    )
+    return cached_count(name, journals.count)
+
+
+def journal_rows(only, publisher_ids, valid_status):
+    """
+    Narrow journal rows in (created_at, id) order with the publishers and status filters.
+    """
+    # narrow rows, id breaks ties between journals created at the same time
+    columns = [Journal.id, Journal.created_at]
+    # fields that are plain columns are selected here, no journals are loaded
+    columns += [getattr(Journal, c) for c in only_columns(only) or []]
+    if only is None:
+        # pre-rendered list documents, when flask build_journal_documents has run
+        columns.append(JournalDocument.list_json)
+    journals = db.session.query(*columns).select_from(Journal)
+    if only is None:
+        # documents rendered before the journal last changed are not used
+        journals = journals.outerjoin(
+            JournalVersion, JournalVersion.issn_l == Journal.issn_l
+        ).outerjoin(
+            JournalDocument,
+            and_(
+                JournalDocument.issn_l == Journal.issn_l,
+                JournalDocument.version == JournalVersion.version,
+            ),
+        )
+    journals = journals.order_by(Journal.created_at.asc(), Journal.id.asc())
+    return filter_journals(journals, publisher_ids, valid_status)
+
+
+def filter_journals(journals, publisher_ids, valid_status):
     if publisher_ids:
         journals = journals.filter(Journal.publisher_id.in_(publisher_ids))
 
     if valid_status:
-        journals = journals.filter_by(status=valid_status)
+        journals = journals.filter(Journal.status == valid_status)
+
+    return journals
+
+
+def journals_by_cursor(journals, cursor, per_page, only):
+    """
+    Keyset pagination on (created_at, id). An empty cursor starts at the first journal.
+    Every page costs the same index range scan and no count is run.
+    """
+    if cursor:
+        created_at, journal_id = decode_cursor(cursor)
+        journals = journals.filter(
+            tuple_(Journal.created_at, Journal.id) > tuple_(created_at, journal_id)
+        )
+
+    # fetch one extra row to find out if there is a next page
+    rows = journals.limit(per_page + 1).all()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    next_cursor = encode_cursor(rows[-1]) if has_next else None
 
-    # pagination
-    journals = journals.paginate(page, per_page)
+    pagination = {
+        "cursor": cursor or None,
+        "next_cursor": next_cursor,
+        "per_page": per_page,
+    }
+
+    base_url = SITE_URL + "/journals-paged"
+    link_header = build_link_header(
+        query=None, base_url=base_url, per_page=per_page, next_cursor=next_cursor
+    )
+    return journal_list_response(rows, only, pagination, link_header)
+
+
+def journal_list_response(rows, only, pagination, link_header):
+    """
+    Journals with a pre-rendered list document are written out as they are, the others
+    are loaded and dumped with JournalListSchema.
+    """
+    documents = [getattr(row, "list_json", None) for row in rows]
+    missing = [row for row, document in zip(rows, documents) if not document]
+    journals = journals_for_rows(missing, only)
 
     # schema with displayed fields based on attrs
     journal_list_schema = JournalListSchema(only=only)
-    journals_dumped = journal_list_schema.dump(journals.items, many=True)
+    journals_dumped = iter(dump(journal_list_schema, journals, many=True))
 
     # combined results with pagination
     results = {
-        "results": journals_dumped,
-        "pagination": {
-            "count": journals.total,
-            "page": page,
-            "per_page": per_page,
-            "pages": journals.pages,
-        },
+        "results": [
+            PreEncoded(document) if document else next(journals_dumped)
+            for document in documents
+        ],
+        "pagination": pagination,
     }
+    return jsonify(results), 200, link_header
 
-    # paginated link headers
-    base_url = SITE_URL + "/journals-paged"
-    link_header = build_link_header(
-        query=journals, base_url=base_url, per_page=per_page
+
+def journals_for_rows(rows, only):
+    """
+    Journals to dump for rows of journal_rows. Rows already hold every column the
+    displayed fields read when those are plain columns.
+    """
+    if only_columns(only) is not None:
+        return rows
+    return load_journals([row.id for row in rows], only)
+
+
+@app.route("/journals/batch", methods=["POST"])
+@swag_from("docs/journals_batch.yml")
+def journals_batch():
+    issns = validate_batch_issns(request.get_json(silent=True))
+    attrs = request.args.get("attrs")
+    only = process_only_fields(attrs) if attrs else None
+
+    journals = Journal.find_many_by_issn(
+        list(dict.fromkeys(issns.values())), options=journal_load_options(only)
     )
-    return jsonify(results), 200, link_header
+
+    # dump each journal once, even if several of its issns were requested
+    journal_list_schema = JournalListSchema(only=only)
+    dumped = {}
+    for journal in journals.values():
+        if journal.issn_l not in dumped:
+            dumped[journal.issn_l] = dump(journal_list_schema, journal)
+
+    results = {}
+    not_found = []
+    for issn, normalized in issns.items():
+        journal = journals.get(normalized)
+        if journal:
+            results[issn] = dumped[journal.issn_l]
+        else:
+            results[issn] = None
+            not_found.append(issn)
+
+    return jsonify({"results": results, "not_found": not_found})
+
+
+@app.route("/journals/changes")
+@swag_from("docs/journal_changes.yml")
+def journal_changes():
+    since = validate_since(request.args.get("since"))
+    cursor = request.args.get("cursor")
+    per_page = validate_per_page(
+        request.args.get("per-page", CHANGES_PER_PAGE, type=int),
+        maximum=CHANGES_PER_PAGE,
+    )
+    documents = request.args.get("documents") == "true"
+
+    # changes of transactions that are still running are left for a later request,
+    # so a cursor never moves past a change that was not committed yet
+    xmin = db.session.execute(
+        "SELECT txid_snapshot_xmin(txid_current_snapshot())"
+    ).scalar()
+    changes = JournalChange.query.filter(JournalChange.txid < xmin)
+    if cursor:
+        changes = changes.filter(
+            tuple_(JournalChange.txid, JournalChange.id)
+            > tuple_(*decode_change_cursor(cursor))
+        )
+    elif since:
+        changes = changes.filter(JournalChange.changed_at >= since)
+
+    # fetch one extra row to find out if there are more changes
+    rows = (
+        changes.order_by(JournalChange.txid, JournalChange.id).limit(per_page + 1).all()
+    )
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if rows:
+        next_cursor = encode_change_cursor(rows[-1].txid, rows[-1].id)
+    else:
+        # nothing new, later changes are logged by transactions from xmin on
+        next_cursor = cursor or encode_change_cursor(xmin, 0)
+
+    # a journal changed several times in the page is listed once, at its last change
+    latest = {}
+    for change in rows:
+        latest.pop(change.issn_l, None)
+        latest[change.issn_l] = change
+
+    results = [
+        {
+            "issn_l": change.issn_l,
+            "version": change.version,
+            "deleted": change.deleted,
+            "changed_at": change.changed_at.isoformat(),
+        }
+        for change in latest.values()
+    ]
+    if documents:
+        journals = changed_journal_documents(
+            [change.issn_l for change in latest.values() if not change.deleted]
+        )
+        for result in results:
+            result["journal"] = journals.get(result["issn_l"])
+
+    pagination = {
+        "cursor": cursor or None,
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+        "per_page": per_page,
+    }
+    return jsonify({"results": results, "pagination": pagination})
+
+
+def changed_journal_documents(issn_ls):
+    """
+    Current list documents of the journals, by issn_l. Journals merged away since
+    they changed are missing.
+    """
+    if not issn_ls:
+        return {}
+
+    rows = (
+        journal_rows(None, [], None)
+        .add_columns(Journal.issn_l)
+        .filter(Journal.issn_l.in_(issn_ls))
+        .all()
+    )
+    documents = {row.issn_l: PreEncoded(row.list_json) for row in rows if row.list_json}
+    missing = [row for row in rows if not row.list_json]
+    journals = journals_for_rows(missing, None)
+    dumped = dump(JournalListSchema(), journals, many=True)
+    for row, journal in zip(missing, dumped):
+        documents[row.issn_l] = journal
+    return documents
+
+
+@app.route("/journals.jsonl")
+@swag_from("docs/journals_jsonl.yml")
+def journals_jsonl():
+    attrs = request.args.get("attrs")
+    only = process_only_fields(attrs) if attrs else None
+    journals = journal_rows(only, *export_filters())
+
+    def generate():
+        # one string per chunk, which compress_stream flushes as a whole
+        for rows in export_chunks(journals):
+            yield "".join(line + "\n" for line in journal_json_lines(rows, only))
+
+    return app.response_class(
+        stream_with_context(generate()), mimetype="application/x-ndjson"
+    )
+
+
+@app.route("/journals.csv")
+@swag_from("docs/journals_csv.yml")
+def journals_csv():
+    attrs = request.args.get("attrs")
+    only = process_only_fields(attrs) if attrs else None
+    # only flat fields fit in a csv column
+    fields = [f for f in CSV_FIELDS if only is None or f in only]
+    journals = journal_rows(fields, *export_filters())
+
+    def generate():
+        journal_list_schema = JournalListSchema(only=fields)
+        yield csv_lines([fields])
+        for rows in export_chunks(journals):
+            dumped = dump(
+                journal_list_schema, journals_for_rows(rows, fields), many=True
+            )
+            yield csv_lines([[csv_value(d.get(f)) for f in fields] for d in dumped])
+
+    return app.response_class(stream_with_context(generate()), mimetype="text/csv")
+
+
+def export_filters():
+    publishers = request.args.get("publishers")
+    publisher_ids = get_publisher_ids(publishers) if publishers else []
+    valid_status = validate_status(request.args.get("status"))
+    return publisher_ids, valid_status
+
+
+def export_chunks(journals):
+    """
+    Streams the rows through a server-side cursor and yields them in chunks, so the
+    first journals go out before the whole catalog is read.
+    """
+    chunk = []
+    for row in journals.yield_per(EXPORT_CHUNK_SIZE):
+        chunk.append(row)
+        if len(chunk) == EXPORT_CHUNK_SIZE:
+            yield chunk
+            chunk = []
+            # loaded journals are not needed after their chunk is written
+            db.session.expunge_all()
+    if chunk:
+        yield chunk
+
+
+def journal_json_lines(rows, only):
+    """
+    JSON of each journal, from its pre-rendered list document when there is one.
+    """
+    missing = [row for row in rows if not getattr(row, "list_json", None)]
+    journals = {j.id: j for j in journals_for_rows(missing, only)}
+    journal_list_schema = JournalListSchema(only=only)
+    for row in rows:
+        document = getattr(row, "list_json", None)
+        yield document if document else json.dumps(
+            dump(journal_list_schema, journals[row.id])
+        )
+
+
+def csv_lines(rows):
+    output = io.StringIO()
+    csv.writer(output).writerows(rows)
+    return output.getvalue()
+
+
+def csv_value(value):
+    if isinstance(value, list):
+        return ";".join(str(v) for v in value)
+    return value
 
 
 @app.route("/journals/<issn_l>/repositories")
 @swag_from("docs/repositories.yml")
+@cached_response(lambda issn_l: [journal_tag(issn_l)])
 def repositories(issn_l):
-    journal = Journal.find_by_issn(issn_l)
+    version = JournalVersion.find_by_issn_l(issn_l)
+    if not_modified(version):
+        return versioned(app.response_class(status=304), version)
+
+    journal = Journal.find_by_issn(issn_l.upper())
+    if not journal:
+        return abort(404, description="Resource not found")
+    elif journal.issn_l != issn_l:
+        return redirect(url_for("repositories", issn_l=journal.issn_l))
+
     repositories = Repository.repositories(issn_l)
     results = {
         "issn_l": journal.issn_l,
         "journal_title": journal.title,
         "repositories": [r.to_dict() for r in repositories],
     }
-    return jsonify(results)
+    return versioned(jsonify(results), version)
 
 
 @app.route("/journals/search")
 @swag_from("docs/search.yml")
+@cached_response(lambda: [JOURNALS_TAG])
 def search():
     query = request.args.get("query")
     page = request.args.get("page")
     page = int(page) if page else None
     if not query:
         return jsonify("no results found")
-    journals = Journal.query.filter(Journal.title.ilike("%" + query + "%")).paginate(
-        page=page, per_page=20
+
+    # substring matches on the current or a former title use the trigram indexes,
+    # closest titles first. Former titles are matched as plain text, one per line.
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    pattern = "%" + escaped + "%"
+    other_titles = func.journal_other_titles(Journal.other_titles)
+    rank = func.greatest(
+        func.word_similarity(query, Journal.title),
+        func.word_similarity(query, other_titles),
+    )
+    journals = (
+        Journal.query.options(joinedload(Journal.publisher))
+        .filter(or_(Journal.title.ilike(pattern), other_titles.ilike(pattern)))
+        .order_by(rank.desc(), Journal.title)
+        .paginate(page=page, per_page=20)
     )
     results = []
     for j in journals.items:
@@ -127,44 +565,81 @@ def search():
                 "publisher": j.publisher.name if j.publisher else None,
             }
         )
-    return jsonify(results)
+    return jsonify(results), 200, {"X-Total-Count": str(journals.total)}
 
 
 @app.route("/journals/<issn>/open-access")
 @swag_from("docs/open_access.yml")
+@cached_response(lambda issn: [journal_tag(issn)])
 def open_access(issn):
-    open_access, num_dois, num_green, num_hybrid = get_open_access(issn)
-    results = {
-        "issn_l": issn,
-        "open_access": open_access,
-        "summary": {
-            "num_dois": num_dois,
-            "num_green": num_green,
-            "num_hybrid": num_hybrid,
-        },
-    }
-    return jsonify(results), 200
-
-
-def get_open_access(issn):
-    open_access = (
-        db.session.query(OpenAccess)
-        .filter_by(issn_l=issn)
-        .filter(OpenAccess.year > 2009)
-        .all()
-    )
-    results = []
-    num_dois = 0
-    num_green = 0
-    num_hybrid = 0
-    for oa in open_access:
-        entry = oa.to_dict()
-        num_dois += entry["num_dois"]
-        num_green += entry["num_green"]
-        num_hybrid += entry["num_hybrid"]
-        results.append(entry)
-    final = sorted(results, key=lambda o: o["year"], reverse=True)
-    return final, num_dois, num_green, num_hybrid
+    version = JournalVersion.find_by_issn_l(issn)
+    if not_modified(version):
+        return versioned(app.response_class(status=304), version)
+
+    if version is None:
+        # print, electronic and merged issns redirect to the journal's issn_l
+        issn_l = Journal.find_issn_ls([issn.upper()]).get(issn.upper())
+        if issn_l and issn_l != issn:
+            return redirect(url_for("open_access", issn=issn_l))
+
+    return versioned(jsonify(open_access_results(issn)), version)
+
+
+@app.route("/open-access/batch", methods=["POST"])
+@swag_from("docs/open_access_batch.yml")
+def open_access_batch():
+    issns = validate_batch_issns(request.get_json(silent=True))
+    issn_ls = Journal.find_issn_ls(list(dict.fromkeys(issns.values())))
+    histories = OpenAccess.histories(set(issn_ls.values()))
+
+    results = {}
+    not_found = []
+    for issn, normalized in issns.items():
+        issn_l = issn_ls.get(normalized)
+        if issn_l:
+            results[issn] = open_access_results(issn_l, histories)
+        else:
+            results[issn] = None
+            not_found.append(issn)
+
+    return jsonify({"results": results, "not_found": not_found})
+
+
+def open_access_results(issn_l, histories=None):
+    """
+    Open access history and summary of a journal, from histories when they were
+    already loaded for a batch.
+    """
+    if histories is None:
+        histories = OpenAccess.histories([issn_l])
+    empty_summary = {"num_dois": 0, "num_green": 0, "num_hybrid": 0}
+    history, summary = histories.get(issn_l, ([], empty_summary))
+    return {"issn_l": issn_l, "open_access": history, "summary": summary}
+
+
+def not_modified(version):
+    """
+    True when the client already has the current version of the journal, checked before
+    anything is loaded or serialized.
+    """
+    if version is None:
+        return False
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(version.etag)
+    if request.if_modified_since:
+        last_modified = version.updated_at.replace(microsecond=0)
+        return last_modified <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def versioned(response, version):
+    """
+    Adds the ETag and Last-Modified headers of the journal version to a response.
+    """
+    if version:
+        response.set_etag(version.etag)
+        response.last_modified = version.updated_at
+    return response
 
 
 @app.route("/missing_journal", methods=["POST"])
@@ -189,6 +664,14 @@ def missing_journal():
     return jsonify({"message": message}), 201
 
 
+@app.route("/cache-stats")
+def cache_stats():
+    """
+    Response cache hits and misses per endpoint, for monitoring.
+    """
+    return jsonify(get_cache_stats())
+
+
 @app.errorhandler(APIError)
 def handle_exception(err):
     """Return custom JSON when APIError or its children are raised"""